@@ -1,13 +1,18 @@
+import os
 from asyncio import sleep
 from time import time
 
 from core.data.CatalogsPool import CatalogsPool
+from core.data.RunJournal import RunJournal
+from core.data.SellerResolver import sellers
+from core.data.SubCatalogResolver import sub_catalogs
 from core.proxies.ProxiesPool import ProxiesPool
 from core.logs import logger as log
 
-from requests import Session as ClientSession
+from core.client.HttpClient import HttpClient
 
-from core.utils import create_csv, archive_report, send_report_sftp, clear_duplicates, get_menu
+from core.utils import create_csv, archive_report, send_report_sftp, clear_duplicates, report_path, set_report_path, \
+    PARSER_STREAMING, PARSER_RESUME
 
 
 class Parser:
@@ -15,51 +20,89 @@ class Parser:
         log.info('Инициализация пула прокси')
         self.proxies_pool = ProxiesPool()
         log.info('Инициализация пула каталогов')
-        self.catalogs_pool = CatalogsPool(get_menu(),ifBySkuList)
+        self.catalogs_pool = CatalogsPool(ifBySkuList)
+        self.journal = RunJournal()
         log.info('Парсер инициализирован')
 
-    async def prepare_catalogs_pool(self, session: ClientSession, is_retry: bool = False, ifBySkuList: bool = False):
-        await self.catalogs_pool.prepare_catalogs(session, self.proxies_pool, is_retry, ifBySkuList)
+    async def prepare_catalogs_pool(self, client: HttpClient, is_retry: bool = False, ifBySkuList: bool = False):
+        await self.catalogs_pool.prepare_catalogs(client, self.proxies_pool, is_retry, ifBySkuList, self.journal)
 
     async def parse(
             self,
-            session: ClientSession,
+            client: HttpClient,
             enable_proxies: bool = True,
             retry_timeout_secs: int = 2 * 60 * 60,
-            ifBySkuList: bool = False
+            ifBySkuList: bool = False,
+            streaming: bool = PARSER_STREAMING,
+            resume: bool = PARSER_RESUME
     ):
         log.success('Начало парсинга')
+        self.journal.start(report_path(), resume)
+        set_report_path(self.journal.report_path)
 
         self.proxies_pool.enabled = enable_proxies
-        await self.proxies_pool.refresh(session)
-        await self.prepare_catalogs_pool(session, ifBySkuList=ifBySkuList)
-
-        # create_csv()
-        # start_time = time()
-
-        # await self.catalogs_pool.parse(session, self.proxies_pool)
-
-        # catalogs_count = len(self.catalogs_pool.catalogs_pool)
-        # retry_catalogs_count = len(self.catalogs_pool.retry_catalogs_pool)
-        # success_catalogs_count = catalogs_count - retry_catalogs_count
-        # success_catalogs_percent = success_catalogs_count / catalogs_count * 100
-
-        # message = f'Парсинг завершился за {(time() - start_time) / 60:.2f} мин. ' \
-        #           f'Собранных каталогов: {success_catalogs_count}/{catalogs_count} ({success_catalogs_percent:.2f}%)'
-
-        # log.success(message) if success_catalogs_percent > 90 else log.critical(message)
-
-        # if retry_catalogs_count:
-        #     start_time = time()
-        #     log.success(f'Ожидание повторного парсинга ({retry_timeout_secs / 60:.2f} мин.)')
-        #     await sleep(retry_timeout_secs)
-        #     log.success(f'Начало повторного парсинга ({retry_catalogs_count} каталогов)')
-        #     await self.proxies_pool.refresh(session)
-        #     await self.prepare_catalogs_pool(session, True, ifBySkuList)
-        #     await self.catalogs_pool.parse(session, self.proxies_pool, True, ifBySkuList)
-        #     log.success(f'Повторный парсинг завершился за {(time() - start_time) / 60:.2f} мин.')
-
-         #clear_duplicates()
-         #archive_report()
-        # #send_report_sftp()
-        # log.send_log_file()
+        await self.proxies_pool.refresh(client)
+        self.proxies_pool.start_monitor(client)
+        try:
+            if streaming and not ifBySkuList:
+                # При продолжении запуска дописывается его отчет, даже если запуск начат в другой день
+                if not self.journal.resumed or not os.path.exists(report_path()):
+                    create_csv()
+                start_time = time()
+                await self.catalogs_pool.stream(client, self.proxies_pool, self.journal)
+                retry_catalogs_count = len(self.catalogs_pool.retry_catalogs_pool)
+                log.success(f'Потоковый парсинг завершился за {(time() - start_time) / 60:.2f} мин. '
+                            f'Каталогов для повторного парсинга: {retry_catalogs_count}')
+                if retry_catalogs_count:
+                    log.success(f'Ожидание повторного парсинга ({retry_timeout_secs / 60:.2f} мин.)')
+                    await sleep(retry_timeout_secs)
+                    log.success(f'Начало повторного парсинга ({retry_catalogs_count} каталогов)')
+                    start_time = time()
+                    await self.proxies_pool.refresh(client)
+                    await self.catalogs_pool.stream(client, self.proxies_pool, self.journal, is_retry=True)
+                    log.success(f'Повторный парсинг завершился за {(time() - start_time) / 60:.2f} мин.')
+                self.journal.finish()
+                return
+
+            await self.prepare_catalogs_pool(client, ifBySkuList=ifBySkuList)
+
+            # create_csv()
+            # start_time = time()
+
+            # await self.catalogs_pool.parse(client, self.proxies_pool, journal=self.journal)
+
+            # catalogs_count = len(self.catalogs_pool.catalogs_pool)
+            # retry_catalogs_count = len(self.catalogs_pool.retry_catalogs_pool)
+            # success_catalogs_count = catalogs_count - retry_catalogs_count
+            # success_catalogs_percent = success_catalogs_count / catalogs_count * 100
+
+            # message = f'Парсинг завершился за {(time() - start_time) / 60:.2f} мин. ' \
+            #           f'Собранных каталогов: {success_catalogs_count}/{catalogs_count} ({success_catalogs_percent:.2f}%)'
+
+            # log.success(message) if success_catalogs_percent > 90 else log.critical(message)
+
+            # if retry_catalogs_count:
+            #     start_time = time()
+            #     log.success(f'Ожидание повторного парсинга ({retry_timeout_secs / 60:.2f} мин.)')
+            #     await sleep(retry_timeout_secs)
+            #     log.success(f'Начало повторного парсинга ({retry_catalogs_count} каталогов)')
+            #     await self.proxies_pool.refresh(client)
+            #     await self.prepare_catalogs_pool(client, True, ifBySkuList)
+            #     await self.catalogs_pool.parse(client, self.proxies_pool, True, ifBySkuList)
+            #     log.success(f'Повторный парсинг завершился за {(time() - start_time) / 60:.2f} мин.')
+
+             #clear_duplicates()
+             #archive_report()
+            # #send_report_sftp()
+            # log.send_log_file()
+
+            self.journal.finish()
+        finally:
+            await self.proxies_pool.stop_monitor()
+            self.proxies_pool.log_stats()
+            log.info(str(client.cache))
+            log.info(str(sub_catalogs.cache))
+            log.info(str(sellers.cache))
+            sub_catalogs.cache.close()
+            sellers.cache.close()
+            self.journal.close()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+from asyncio import Future, TimeoutError, get_running_loop
+from collections import deque
+from time import monotonic
+
+from core.logs import logger as log
+
+
+class AdaptiveLimiter:
+    """
+    Ограничение кол-ва одновременных задач с подстройкой по принципу AIMD.
+
+    Лимит растет на единицу после каждых `limit` успешных запросов, пока задержка
+    и доля ошибок в пределах целевых значений, и умножается на `decrease_factor`
+    при таймаутах, 429 или превышении целей (не чаще раза в `cooldown_secs`).
+
+    :param initial: Начальный лимит
+    :param min_limit: Минимальный лимит
+    :param max_limit: Максимальный лимит
+    :param latency_target_secs: Целевая средняя задержка запроса
+    :param error_rate_target: Целевая доля ошибок в окне
+    :param decrease_factor: Множитель лимита при перегрузке
+    :param cooldown_secs: Минимальный интервал между снижениями лимита
+    :param log_interval_secs: Минимальный интервал между записями лимита в лог
+    """
+
+    def __init__(
+            self,
+            initial: int = 45,
+            min_limit: int = 5,
+            max_limit: int = 200,
+            latency_target_secs: float = 5.0,
+            error_rate_target: float = 0.05,
+            decrease_factor: float = 0.7,
+            cooldown_secs: float = 2.0,
+            log_interval_secs: float = 30.0
+    ):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_secs = latency_target_secs
+        self.error_rate_target = error_rate_target
+        self.decrease_factor = decrease_factor
+        self.cooldown_secs = cooldown_secs
+        self.log_interval_secs = log_interval_secs
+        self.in_flight = 0
+        self.waiters: deque[Future] = deque()
+        self.latency_ewma: float | None = None
+        self.window_requests = 0
+        self.window_errors = 0
+        self.decreased_at = 0.0
+        self.logged_at = 0.0
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+    async def acquire(self):
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            return
+        waiter = get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Место уже выделено, но задача отменена - место возвращается
+                self.release()
+            elif waiter in self.waiters:
+                self.waiters.remove(waiter)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def record(self, latency: float, status_code: int | None, error: BaseException | None = None):
+        """
+        Учет результата запроса.
+
+        :param latency: Время запроса в секундах
+        :param status_code: HTTP-статус ответа, None если запрос завершился ошибкой
+        :param error: Исключение, которым завершился запрос
+        """
+
+        self.latency_ewma = latency if self.latency_ewma is None else 0.2 * latency + 0.8 * self.latency_ewma
+        self.window_requests += 1
+        is_error = status_code is None or status_code == 429 or status_code >= 500
+        self.window_errors += is_error
+
+        if status_code == 429 or isinstance(error, TimeoutError):
+            self._decrease('429' if status_code == 429 else 'таймаут')
+        elif self.window_requests >= self.limit:
+            error_rate = self.window_errors / self.window_requests
+            if error_rate > self.error_rate_target:
+                self._decrease(f'ошибок {error_rate * 100:.1f}%')
+            elif self.latency_ewma > self.latency_target_secs:
+                self._decrease(f'задержка {self.latency_ewma:.2f}с')
+            else:
+                self._set_limit(self.limit + 1, 'рост')
+            self.window_requests = self.window_errors = 0
+
+        if monotonic() - self.logged_at >= self.log_interval_secs:
+            self.logged_at = monotonic()
+            self.log_state('текущий')
+
+    def _decrease(self, reason: str):
+        now = monotonic()
+        if now - self.decreased_at < self.cooldown_secs:
+            return
+        self.decreased_at = now
+        self.window_requests = self.window_errors = 0
+        self._set_limit(int(self.limit * self.decrease_factor), reason)
+
+    def _set_limit(self, limit: int, reason: str):
+        limit = max(self.min_limit, min(self.max_limit, limit))
+        if limit == self.limit:
+            return
+        self.limit = limit
+        now = monotonic()
+        self._wake()
+        if now - self.logged_at >= self.log_interval_secs or reason != 'рост':
+            self.logged_at = now
+            self.log_state(reason)
+
+    def log_state(self, reason: str = ''):
+        latency = f'{self.latency_ewma:.2f}с' if self.latency_ewma is not None else '-'
+        log.info(f'Лимит параллельности: {self.limit} ({reason}), в работе {self.in_flight}, задержка {latency}')
@@ -0,0 +1,219 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+from time import time
+from typing import Any, Callable, TYPE_CHECKING
+
+from core.logs import logger as log
+
+if TYPE_CHECKING:
+    from core.client.HttpClient import HttpClient
+    from core.proxies.ProxyServer import ProxyServer
+
+# Файл кэша статических JSON-файлов (пустая строка отключает кэш), срок свежести и размер
+_PARSER_HTTP_CACHE_PATH = os.getenv('PARSER_HTTP_CACHE_PATH', 'csv/http_cache.sqlite')
+_PARSER_HTTP_CACHE_TTL_HOURS = float(os.getenv('PARSER_HTTP_CACHE_TTL_HOURS', '72'))
+_PARSER_HTTP_CACHE_MAX_MB = float(os.getenv('PARSER_HTTP_CACHE_MAX_MB', '512'))
+
+
+class HttpCache:
+    """
+    Постоянный кэш JSON-ответов статических файлов по URL с условными запросами.
+
+    Свежая запись (моложе `ttl_secs`) возвращается без запроса. Устаревшая запись
+    перепроверяется запросом с `If-None-Match`/`If-Modified-Since`, и при ответе 304
+    файл не скачивается. Хранится не весь файл, а результат `reduce` - только нужные поля,
+    поэтому попадания не разбирают исходный JSON. При превышении `max_bytes`
+    удаляются записи, к которым дольше всего не обращались.
+
+    :param path: Путь к файлу SQLite, пустая строка отключает кэш
+    :param ttl_secs: Срок, в течение которого запись используется без запроса
+    :param max_bytes: Максимальный размер сохраненных ответов
+    :param commit_every: Кол-во изменений, после которого они сохраняются на диск
+    """
+
+    def __init__(
+            self,
+            path: str = _PARSER_HTTP_CACHE_PATH,
+            ttl_secs: float = _PARSER_HTTP_CACHE_TTL_HOURS * 60 * 60,
+            max_bytes: int = int(_PARSER_HTTP_CACHE_MAX_MB * 1024 * 1024),
+            commit_every: int = 500
+    ):
+        self.path = path
+        self.ttl_secs = ttl_secs
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.connection: sqlite3.Connection | None = None
+        # Время последнего обращения к свежим записям, сохраняется в файл при commit
+        self.accessed: dict[str, float] = {}
+        self.enabled = bool(path)
+        self.total_bytes = 0
+        self.pending_changes = 0
+        self.fresh_hits = 0
+        self.revalidated_hits = 0
+        self.downloads = 0
+
+    def connect(self) -> sqlite3.Connection | None:
+        if self.connection is not None or not self.enabled:
+            return self.connection
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT NOT NULL, '
+                'stored_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)'
+            )
+            self.connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)')
+            self.total_bytes = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        except sqlite3.Error as e:
+            log.error(f'Ошибка открытия HTTP-кэша {self.path}, кэш отключен. {type(e)}: {e}')
+            self.enabled = False
+            self.connection = None
+        return self.connection
+
+    async def get_json(
+            self,
+            client: HttpClient,
+            url: str,
+            proxy: ProxyServer | None = None,
+            reduce: Callable[[Any], Any] | None = None,
+            record_concurrency: bool = False,
+            ttl_secs: float | None = None
+    ) -> tuple[int, Any]:
+        """
+        Получение JSON-файла через кэш.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param url: Адрес файла
+        :param proxy: Прокси-сервер, через который выполняется запрос
+        :param reduce: Выбор сохраняемых полей из JSON-ответа
+        :param record_concurrency: Учитывать результат запроса в адаптивном лимите параллельности
+        :param ttl_secs: Срок свежести записи вместо `self.ttl_secs`
+
+        :return: HTTP-статус (200 для попаданий) и JSON, None если ответ не 200
+        """
+
+        connection = self.connect()
+        entry = None
+        if connection is not None:
+            entry = connection.execute(
+                'SELECT etag, last_modified, body, stored_at FROM responses WHERE url = ?', (url,)
+            ).fetchone()
+
+        now = time()
+        if ttl_secs is None:
+            ttl_secs = self.ttl_secs
+        headers = {}
+        if entry is not None:
+            etag, last_modified, body, stored_at = entry
+            if now - stored_at < ttl_secs:
+                self.fresh_hits += 1
+                self.touch(url, now)
+                return 200, json.loads(body)
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = await client.get(url, proxy=proxy, headers=headers or None, record_concurrency=record_concurrency)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated_hits += 1
+            self.revalidate(url, now)
+            return 200, json.loads(entry[2])
+        if response.status_code != 200:
+            return response.status_code, None
+
+        self.downloads += 1
+        data = response.json()
+        if reduce is not None:
+            data = reduce(data)
+        if connection is not None:
+            response_headers = {key.lower(): value for key, value in response.headers.items()}
+            self.store(url, response_headers.get('etag'), response_headers.get('last-modified'), json.dumps(data), now)
+        return 200, data
+
+    def touch(self, url: str, now: float):
+        """Отметка обращения к свежей записи без записи в файл, отметки сохраняются пачкой."""
+
+        self.accessed[url] = now
+        if len(self.accessed) >= self.commit_every:
+            self.commit()
+
+    def revalidate(self, url: str, now: float):
+        self.accessed.pop(url, None)
+        self.connection.execute('UPDATE responses SET accessed_at = ?, stored_at = ? WHERE url = ?', (now, now, url))
+        self.changed()
+
+    def flush_accessed(self):
+        if not self.accessed:
+            return
+        accessed, self.accessed = self.accessed, {}
+        self.connection.executemany(
+            'UPDATE responses SET accessed_at = ? WHERE url = ?',
+            ((accessed_at, url) for url, accessed_at in accessed.items())
+        )
+        self.pending_changes += 1
+
+    def store(self, url: str, etag: str | None, last_modified: str | None, body: str, now: float):
+        size = len(body)
+        self.accessed.pop(url, None)
+        previous = self.connection.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        self.connection.execute(
+            'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (url, etag, last_modified, body, now, now, size)
+        )
+        self.total_bytes += size - (previous[0] if previous else 0)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+        self.changed()
+
+    def evict(self):
+        """Удаление давно не использованных записей до 90% от `max_bytes`."""
+
+        target = self.max_bytes * 0.9
+        self.flush_accessed()
+        while self.total_bytes > target:
+            rows = self.connection.execute(
+                'SELECT url, size FROM responses ORDER BY accessed_at LIMIT 1000'
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            evicted = []
+            for url, size in rows:
+                if self.total_bytes <= target:
+                    break
+                evicted.append((url,))
+                self.total_bytes -= size
+            self.connection.executemany('DELETE FROM responses WHERE url = ?', evicted)
+
+    def changed(self):
+        self.pending_changes += 1
+        if self.pending_changes >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        if self.connection is None:
+            return
+        self.flush_accessed()
+        if self.pending_changes:
+            self.connection.commit()
+            self.pending_changes = 0
+
+    def close(self):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __str__(self):
+        hits = self.fresh_hits + self.revalidated_hits
+        total = hits + self.downloads
+        hit_rate = hits / total * 100 if total else 0
+        return f'HTTP-кэш: попаданий {hits}/{total} ({hit_rate:.2f}%), без запроса {self.fresh_hits}, ' \
+               f'подтверждено (304) {self.revalidated_hits}, загружено {self.downloads}, ' \
+               f'размер {self.total_bytes / 1024 / 1024:.1f} МБ'
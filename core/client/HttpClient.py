@@ -0,0 +1,181 @@
+from __future__ import annotations
+from time import monotonic
+from typing import Any, Callable, TYPE_CHECKING
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from core.client.AdaptiveLimiter import AdaptiveLimiter
+from core.client.HttpCache import HttpCache
+from core.client.HttpResponse import HttpResponse
+from core.client.RateLimiter import RateLimiter
+
+if TYPE_CHECKING:
+    from core.proxies.ProxyServer import ProxyServer
+
+
+class HttpClient:
+    """
+    Асинхронный HTTP-клиент поверх aiohttp, через который проходят все запросы парсера.
+
+    Для каждого прокси-сервера (и для прямых запросов) держится отдельный пул соединений
+    со своим лимитом и keep-alive, поэтому запросы через разные прокси не делят соединения.
+
+    :param limit_per_proxy: Максимальное кол-во одновременных соединений через один прокси
+    :param limit_per_host: Максимальное кол-во одновременных соединений с одним хостом в пуле прокси
+    :param timeout_secs: Таймаут запроса в секундах
+    :param keepalive_secs: Время жизни неиспользуемого соединения в секундах
+    :param rate_limiter: Ограничение скорости запросов по хостам
+    :param concurrency: Адаптивный лимит параллельности задач, подстраивается по результатам их запросов
+    :param cache: Постоянный кэш статических JSON-файлов
+    """
+
+    def __init__(
+            self,
+            limit_per_proxy: int = 100,
+            limit_per_host: int = 30,
+            timeout_secs: float = 30.0,
+            keepalive_secs: float = 30.0,
+            rate_limiter: RateLimiter | None = None,
+            concurrency: AdaptiveLimiter | None = None,
+            cache: HttpCache | None = None
+    ):
+        self.limit_per_proxy = limit_per_proxy
+        self.limit_per_host = limit_per_host
+        self.timeout = ClientTimeout(total=timeout_secs)
+        self.keepalive_secs = keepalive_secs
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.concurrency = concurrency if concurrency is not None else AdaptiveLimiter()
+        self.cache = cache if cache is not None else HttpCache()
+        self.sessions: dict[str | None, ClientSession] = {}
+        self.closed = True
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def open(self):
+        self.closed = False
+
+    def session(self, proxy_url: str | None) -> ClientSession:
+        """
+        Пул соединений прокси, создается при первом обращении.
+
+        :param proxy_url: URL прокси-сервера, None для прямых запросов
+        """
+
+        session = self.sessions.get(proxy_url)
+        if session is None or session.closed:
+            session = ClientSession(
+                connector=TCPConnector(
+                    limit=self.limit_per_proxy,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_secs,
+                    ssl=False
+                ),
+                timeout=self.timeout
+            )
+            self.sessions[proxy_url] = session
+        return session
+
+    async def close(self):
+        self.closed = True
+        self.cache.close()
+        sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            if not session.closed:
+                await session.close()
+
+    async def request(
+            self,
+            method: str,
+            url: str,
+            proxy: ProxyServer | None = None,
+            headers: dict | None = None,
+            rate_limited: bool = True,
+            record_concurrency: bool = False
+    ) -> HttpResponse:
+        """
+        Выполнение HTTP-запроса.
+
+        :param method: HTTP-метод
+        :param url: Адрес запроса
+        :param proxy: Прокси-сервер, через который выполняется запрос
+        :param headers: Дополнительные заголовки
+        :param rate_limited: Учитывать ограничение скорости запросов к хосту
+        :param record_concurrency: Учитывать результат в адаптивном лимите параллельности,
+            только для запросов задач, которые этот лимит ограничивает
+        """
+
+        if self.closed:
+            raise RuntimeError('HTTP-клиент закрыт')
+        proxy_url = proxy.as_url() if proxy else None
+        if rate_limited:
+            await self.rate_limiter.acquire(url, proxy_url)
+        started = monotonic()
+        try:
+            async with self.session(proxy_url).request(
+                    method,
+                    url,
+                    proxy=proxy_url,
+                    headers=headers
+            ) as response:
+                text = await response.text(errors='replace')
+        except Exception as e:
+            if proxy:
+                proxy.record(monotonic() - started, None)
+            if record_concurrency:
+                self.concurrency.record(monotonic() - started, None, e)
+            raise
+        latency = monotonic() - started
+        if proxy:
+            proxy.record(latency, response.status)
+        response_headers = dict(response.headers)
+        if rate_limited:
+            self.rate_limiter.feedback(url, proxy_url, response.status, response_headers)
+        if record_concurrency:
+            self.concurrency.record(latency, response.status)
+        return HttpResponse(url, response.status, text, response_headers)
+
+    async def get(
+            self,
+            url: str,
+            proxy: ProxyServer | None = None,
+            headers: dict | None = None,
+            rate_limited: bool = True,
+            record_concurrency: bool = False
+    ) -> HttpResponse:
+        return await self.request('GET', url, proxy, headers, rate_limited, record_concurrency)
+
+    async def post(
+            self,
+            url: str,
+            proxy: ProxyServer | None = None,
+            headers: dict | None = None,
+            rate_limited: bool = True,
+            record_concurrency: bool = False
+    ) -> HttpResponse:
+        return await self.request('POST', url, proxy, headers, rate_limited, record_concurrency)
+
+    async def get_cached_json(
+            self,
+            url: str,
+            proxy: ProxyServer | None = None,
+            reduce: Callable[[Any], Any] | None = None,
+            record_concurrency: bool = False,
+            ttl_secs: float | None = None
+    ) -> tuple[int, Any]:
+        """
+        Получение статического JSON-файла через постоянный кэш.
+
+        :param url: Адрес файла
+        :param proxy: Прокси-сервер, через который выполняется запрос
+        :param reduce: Выбор сохраняемых полей из JSON-ответа
+        :param record_concurrency: Учитывать результат запроса в адаптивном лимите параллельности
+        :param ttl_secs: Срок свежести записи, по умолчанию срок кэша
+
+        :return: HTTP-статус и JSON, None если ответ не 200
+        """
+
+        return await self.cache.get_json(self, url, proxy, reduce, record_concurrency, ttl_secs)
@@ -0,0 +1,16 @@
+import json
+from dataclasses import dataclass, field
+
+
+@dataclass
+class HttpResponse:
+    url:            str
+    status_code:    int
+    text:           str
+    headers:        dict = field(default_factory=dict)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __str__(self):
+        return f"{self.status_code} {self.url}"
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import os
+from asyncio import sleep
+from time import monotonic
+from urllib.parse import urlparse
+
+from core.logs import logger as log
+
+# Ограничения запросов в секунду по хостам: "catalog.wb.ru=20,card.wb.ru=15,..."
+_PARSER_RATE_LIMITS = os.getenv('PARSER_RATE_LIMITS', '')
+_PARSER_RATE_LIMITS_PER_PROXY = os.getenv('PARSER_RATE_LIMITS_PER_PROXY', '0') == '1'
+
+# Правило - суффикс хоста и, при необходимости, префикс пути
+DEFAULT_RATES = {
+    'catalog.wb.ru': 20.0,
+    'card.wb.ru': 20.0,
+    'wbbasket.ru': 50.0,
+    'product-order-qnt.wildberries.ru': 10.0,
+    'www.wildberries.ru/webapi': 10.0,
+}
+
+
+class TokenBucket:
+    """
+    Корзина токенов с пониженной скоростью после 429 и постепенным восстановлением.
+    Вместимость корзины не меньше одного токена, иначе при скорости ниже
+    1 запроса в секунду запрос не дождется токена.
+
+    :param rate: Базовая скорость, запросов в секунду
+    :param min_rate: Минимальная скорость после снижений
+    """
+
+    BACKOFF_FACTOR = 0.5
+    RECOVERY_STEP = 0.05
+    DEFAULT_RETRY_AFTER_SECS = 1.0
+
+    def __init__(self, rate: float, min_rate: float = 0.5):
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.tokens = self.capacity
+        self.updated = monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            now = monotonic()
+            if now < self.blocked_until:
+                await sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await sleep((1 - self.tokens) / self.rate)
+
+    def throttled(self, retry_after_secs: float | None = None):
+        self.rate = max(self.min_rate, self.rate * self.BACKOFF_FACTOR)
+        self.tokens = min(self.tokens, self.capacity)
+        pause = retry_after_secs if retry_after_secs is not None else self.DEFAULT_RETRY_AFTER_SECS
+        self.blocked_until = max(self.blocked_until, monotonic() + pause)
+
+    def succeeded(self):
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * self.RECOVERY_STEP)
+
+
+class RateLimiter:
+    """
+    Ограничение скорости запросов по хостам (и, при `per_proxy`, по парам хост-прокси).
+    Запросы к хостам без правила не ограничиваются.
+
+    :param rates: Запросов в секунду по правилу (суффикс хоста и префикс пути)
+    :param per_proxy: Отдельная корзина для каждой пары хост-прокси
+    """
+
+    def __init__(
+            self,
+            rates: dict[str, float] | None = None,
+            per_proxy: bool = _PARSER_RATE_LIMITS_PER_PROXY
+    ):
+        self.rates = rates if rates is not None else {**DEFAULT_RATES, **self.parse_rates(_PARSER_RATE_LIMITS)}
+        self.per_proxy = per_proxy
+        self.buckets: dict[tuple, TokenBucket] = {}
+        self.throttled_count = 0
+
+    @staticmethod
+    def parse_rates(value: str) -> dict[str, float]:
+        rates = {}
+        for item in filter(None, (item.strip() for item in value.split(','))):
+            try:
+                rule, rate = item.split('=')
+                rates[rule.strip()] = float(rate)
+            except ValueError:
+                log.error(f'Ошибка разбора ограничения скорости "{item}"')
+        return rates
+
+    def _rule(self, url: str) -> tuple[str, float] | None:
+        parsed = urlparse(url)
+        for rule, rate in self.rates.items():
+            host, _, path = rule.partition('/')
+            if (parsed.hostname or '').endswith(host) and parsed.path.lstrip('/').startswith(path):
+                return rule, rate
+        return None
+
+    def bucket(self, url: str, proxy_url: str | None = None) -> TokenBucket | None:
+        rule = self._rule(url)
+        if rule is None:
+            return None
+        key = (urlparse(url).hostname, rule[0], proxy_url if self.per_proxy else None)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rule[1])
+        return bucket
+
+    async def acquire(self, url: str, proxy_url: str | None = None):
+        bucket = self.bucket(url, proxy_url)
+        if bucket is not None:
+            await bucket.acquire()
+
+    def feedback(self, url: str, proxy_url: str | None, status_code: int, headers: dict):
+        bucket = self.bucket(url, proxy_url)
+        if bucket is None:
+            return
+        retry_after = self.retry_after(headers)
+        if status_code == 429 or retry_after is not None:
+            self.throttled_count += 1
+            bucket.throttled(retry_after)
+        else:
+            bucket.succeeded()
+
+    @staticmethod
+    def retry_after(headers: dict) -> float | None:
+        value = next((value for key, value in headers.items() if key.lower() == 'retry-after'), None)
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
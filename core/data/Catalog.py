@@ -1,15 +1,15 @@
-from typing import AsyncIterable
-from tqdm.asyncio import tqdm_asyncio as tqdm
+from typing import Awaitable, Callable
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from threading import Timer
-import json
 from asyncio import gather, Semaphore
-from requests import Session as ClientSession
+from core.client.HttpClient import HttpClient
 from core.data.CatalogFilter import CatalogFilter
 from core.data.CatalogStatus import CatalogStatus, CatalogType
+from core.data.PartitionPlanner import PartitionPlanner, BISECTION_THRESHOLD
 from core.data.Product import Product
+from core.data.QueryVariantCache import query_variants
 from core.proxies.ProxiesPool import ProxiesPool
-from core.utils import generate_pages_for_filter, api_filters, api_brand_filters
+from core.utils import generate_pages_for_filter, api_filters, api_brand_filters, datetime_product, \
+    PARSER_FILTERS_CONCURRENCY, PARSER_PAGES_CONCURRENCY, PAGE_SIZE
 
 from core.logs import logger as log
 
@@ -31,7 +31,15 @@ class Catalog:
         self.total_items_count_percent = 0
         self.parsed_items_count = 0
         self.parsed_items_percentages = 0
-        self.parsed_items = []
+        self.pending_items_count = 0
+        self.discovery_finished = True
+        self.batch_cards_count = 0
+        self.batch_orders_count = 0
+        # Продукты, которые не удалось собрать, и продукты, уже выведенные в отчет.
+        # Выведенные продукты хранятся только для каталогов повторного парсинга
+        self.failed_skus: set[int] = set()
+        self.parsed_skus: set[int] = set()
+        self.start_time = ''
         self.name = name
         self.query = query
         self.shard = shard
@@ -40,11 +48,23 @@ class Catalog:
         self.brand_id = brand_id
         self.source_address = address
         self.filters_pool: list[CatalogFilter] = []
+        self.price_range: tuple[int, int] = (0, 100_000_000)
         self.skus_pool: list[int] = skus_pool
         self.status = CatalogStatus.ENQUEUED
 
     def __str__(self):
         return f"{self.name} {self.total_items_count} тов. {self.source_address}"
+
+    @property
+    def partition_key(self) -> str:
+        """Ключ каталога в файле ценовых фильтров прошлого запуска."""
+
+        return f'{self.catalog_type.value}:{self.name}:{self.query or self.brand_id}:{self.xsubject}'
+
+    def partitions(self) -> list[CatalogFilter]:
+        """Фильтры каталога, без пропусков покрывающие весь ценовой диапазон."""
+
+        return PartitionPlanner.cover(self.filters_pool, *self.price_range)
     
     @staticmethod
     def build_url_with_params(address: str, params: dict):
@@ -57,59 +77,147 @@ class Catalog:
         url_parts[4] = urlencode(query, doseq=True)
         return urlunparse(url_parts)
 
-    async def fetch_json_response(self, session: ClientSession, address: str, proxies: ProxiesPool):
-        for spp in [0, 30, None]:
-            for curr in [None, 'rub']:
-                for app_type in [1, None, 30, 2, 3]:
-                    new_address = self.build_url_with_params(
-                        address,
-                        {
-                            'appType': app_type,
-                            'curr': curr,
-                            'spp': spp
-                        }
-                    )
-                    proxy = proxies.get_random_proxy()
-                    prox = proxy.as_string()
-                    session.proxies.update(prox)
-                    try:
-                        with session.get(
-                                new_address,
-                                verify=False
-                                #proxy=proxies.get_random_proxy().as_string()
-                        ) as response:
-                            if response.status_code == 200:
-                                return json.loads(response.text), new_address
-                    except Exception as e:
-                        log.error(e)
+    async def fetch_json_response(self, client: HttpClient, address: str, proxies: ProxiesPool):
+        new_address = address
+        # Первой пробуется комбинация параметров, сработавшая для этого семейства адресов в прошлый раз
+        for index, params in query_variants.variants(address):
+            new_address = self.build_url_with_params(address, params)
+            try:
+                response = await client.get(new_address, proxy=proxies.get_random_proxy())
+                if response.status_code == 200:
+                    json_response = response.json()
+                    query_variants.success(address, index)
+                    return json_response, new_address
+            except Exception as e:
+                log.error(e)
+            query_variants.failure(address, index)
         return None, new_address
 
     async def prepare_catalog(
             self,
-            session: ClientSession,
-            proxies: ProxiesPool
+            client: HttpClient,
+            proxies: ProxiesPool,
+            history: list[CatalogFilter] | None = None,
+            semaphore: Semaphore | None = None,
+            on_skus: Callable[[list[int]], Awaitable] | None = None
     ):
+        """
+        Подготовка каталога: разбиение на ценовые фильтры и сбор идентификаторов продуктов.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param history: Фильтры каталога из прошлого запуска
+        :param semaphore: Общее ограничение кол-ва одновременных запросов, если каталоги готовятся параллельно
+        :param on_skus: Вызывается с новыми идентификаторами каждой полученной страницы
+        """
+
+        if semaphore is None:
+            semaphore = Semaphore(PARSER_FILTERS_CONCURRENCY)
         log.info(f'Инициализация пула фильтров каталога {self.name}')
-        await self.fetch_filters_pool(session, proxies)
+        await self.fetch_filters_pool(client, proxies, history=history, semaphore=semaphore)
         log.info(f'Пул фильтров каталога {self.name} инициализирован')
         log.info(f'Инициализация пула идентификаторов продуктов каталога {self.name}')
-        await self.fetch_skus_pool(session, proxies)
+        await self.fetch_skus_pool(client, proxies, semaphore, on_skus)
         log.info(f'Пул идентификаторов продуктов каталога {self.name} инициализирован')
 
     async def fetch_filters_pool(
             self,
-            session: ClientSession,
+            client: HttpClient,
             proxies: ProxiesPool,
-            address: str|None = None
+            address: str|None = None,
+            history: list[CatalogFilter] | None = None,
+            semaphore: Semaphore | None = None
     ):
+        """
+        Разбиение каталога на ценовые фильтры.
+        Если есть фильтры прошлого запуска, каждый из них проверяется одним запросом,
+        заново разбиваются только фильтры, переполнившие лимит выдачи.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param address: URL фильтров каталога
+        :param history: Фильтры каталога из прошлого запуска
+        :param semaphore: Ограничение кол-ва одновременных запросов
+        """
+
+        # При повторной подготовке фильтры и счетчики прошлой подготовки не учитываются
+        self.filters_pool = []
+        self.total_items_count = 0
+        self.total_pages_count = 0
+
         if self.catalog_type == CatalogType.BRAND:
             if address is None:
                 address = api_brand_filters(self.brand_id, 0, 100_000_000, self.xsubject)
         else:
             if address is None:
                 address = api_filters(self.shard, self.query, 0, 100_000_000, self.xsubject)
+
+        url_parts = list(urlparse(address))
+        query = dict(parse_qs(url_parts[4]))
+        min_price, max_price = [int(x) for x in query.get('priceU', ['0;100000000'])[0].split(';')]
+        self.price_range = (min_price, max_price)
+
+        if semaphore is None:
+            semaphore = Semaphore(PARSER_FILTERS_CONCURRENCY)
+        planner = PartitionPlanner(history=history)
+        if history:
+            parts = await gather(*(
+                self.fetch_filters(
+                    client,
+                    proxies,
+                    self.build_url_with_params(address, {'priceU': f'{catalog_filter.min_price};{catalog_filter.max_price}'}),
+                    semaphore,
+                    planner
+                )
+                for catalog_filter in PartitionPlanner.cover(history, min_price, max_price)
+            ))
+            catalog_filters = [catalog_filter for part in parts for catalog_filter in part]
+            log.info(f'Фильтры каталога {self.name} проверены по прошлому запуску: '
+                     f'{len(history)} -> {len(catalog_filters)}, '
+                     f'разбито заново {sum(len(part) > 1 for part in parts)}')
+        else:
+            catalog_filters = await self.fetch_filters(client, proxies, address, semaphore, planner)
+        if not catalog_filters:
+            self.status = CatalogStatus.FAILURE
+
+        # Счетчики обновляются после обхода всего дерева, порядок фильтров - по возрастанию цены
+        for catalog_filter in catalog_filters:
+            self.total_items_count += catalog_filter.total_items
+            self.total_pages_count += catalog_filter.total_pages
+            self.filters_pool.append(catalog_filter)
+
+        if catalog_filters:
+            bisection_requests = planner.bisection_requests(catalog_filters, min_price, max_price)
+            log.info(f'Запросов фильтров для каталога {self.name}: {planner.requests_count}, '
+                     f'при делении пополам по {BISECTION_THRESHOLD} товаров ~{bisection_requests}, '
+                     f'сэкономлено ~{bisection_requests - planner.requests_count}')
+
+    async def fetch_filters(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            address: str,
+            semaphore: Semaphore,
+            planner: PartitionPlanner
+    ) -> list[CatalogFilter]:
+        """
+        Рекурсивное разбиение ценового диапазона, пока в диапазоне больше товаров, чем помещается в выдачу.
+        Точки разбиения выбирает `planner`, части диапазона обходятся параллельно,
+        кол-во одновременных запросов ограничено семафором.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param address: URL фильтров с ценовым диапазоном
+        :param semaphore: Ограничение кол-ва одновременных запросов фильтров
+        :param planner: Планировщик разбиения ценового диапазона
+
+        :return: Фильтры диапазона по возрастанию цены
+        """
+
         try:
-            json_response, new_address = await self.fetch_json_response(session, address, proxies)
+            async with semaphore:
+                planner.requests_count += 1
+                json_response, new_address = await self.fetch_json_response(client, address, proxies)
 
             if json_response is not None:
                 total_products = json_response \
@@ -119,45 +227,53 @@ class Catalog:
                 url_parts = list(urlparse(address))
                 query = dict(parse_qs(url_parts[4]))
                 min_price, max_price = [int(x) for x in query.get('priceU', ['0;100000000'])[0].split(';')]
-                mid_price = (min_price + max_price) // 2
-
-                if total_products > 1000 and max_price - min_price > 2:
-                    lower_price_url = self.build_url_with_params(address, {'priceU': f'{min_price};{mid_price}'})
-                    await self.fetch_filters_pool(session, proxies, lower_price_url)
-                    higher_price_url = self.build_url_with_params(address, {'priceU': f'{mid_price + 1};{max_price}'})
-                    await self.fetch_filters_pool(session, proxies, higher_price_url)
-                elif total_products != 0:
-                    total_pages = total_products // 100 + 1
-                    self.total_items_count += total_products
-                    self.total_pages_count += total_pages
-                    self.filters_pool.append(
-                        CatalogFilter(
-                            name=self.name,
-                            total_pages=total_pages,
-                            total_items=total_products,
-                            min_price=min_price,
-                            max_price=max_price
+
+                if total_products == 0:
+                    return []
+
+                if not planner.is_leaf(total_products, min_price, max_price):
+                    bounds = planner.price_bounds(json_response)
+                    parts = await gather(*(
+                        self.fetch_filters(
+                            client,
+                            proxies,
+                            self.build_url_with_params(address, {'priceU': f'{low};{high}'}),
+                            semaphore,
+                            planner
                         )
+                        for low, high in planner.split(min_price, max_price, total_products, bounds)
+                    ))
+                    return [catalog_filter for part in parts for catalog_filter in part]
+
+                total_pages = total_products // PAGE_SIZE + 1
+                return [
+                    CatalogFilter(
+                        name=self.name,
+                        total_pages=total_pages,
+                        total_items=total_products,
+                        min_price=min_price,
+                        max_price=max_price
                     )
-                else:
-                    self.status = CatalogStatus.FAILURE
+                ]
             else:
                 self.status = CatalogStatus.FAILURE
         except Exception as e:
             self.status = CatalogStatus.FAILURE
+        return []
 
     async def fetch_skus_pool(
             self,
-            session: ClientSession,
-            proxies: ProxiesPool
+            client: HttpClient,
+            proxies: ProxiesPool,
+            semaphore: Semaphore | None = None,
+            on_skus: Callable[[list[int]], Awaitable] | None = None
     ):
         self.skus_pool = []
+        seen_skus = set()
         for catalog_filter in self.filters_pool:
             if catalog_filter.total_items == 0:
                 continue
-            for catalog_page in generate_pages_for_filter(catalog_filter, self.shard, self.query, self.xsubject, self.catalog_type, self.brand_id):
-                async for product_sku in self.parse_product_skus(catalog_page, session, proxies):
-                    self.skus_pool.append(product_sku)
+            self.skus_pool += await self.fetch_filter_skus(client, proxies, catalog_filter, seen_skus, semaphore, on_skus)
 
         if self.total_items_count == 0:
             log.critical(f'В каталоге {self.name} собрано 0 продуктов')
@@ -172,51 +288,130 @@ class Catalog:
         log_fun(f'Подготовлено продуктов: {len(self.skus_pool)}/{self.total_items_count} '
                 f'({self.total_items_count_percent:.2f}%) для каталога {self.name}')
 
-    async def parse_product_skus(
+    async def fetch_filter_skus(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            catalog_filter: CatalogFilter,
+            seen_skus: set[int],
+            semaphore: Semaphore | None = None,
+            on_skus: Callable[[list[int]], Awaitable] | None = None
+    ) -> list[int]:
+        """
+        Параллельный сбор идентификаторов продуктов со страниц фильтра.
+        Новые страницы не запрашиваются после первой неполной или пустой страницы.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param catalog_filter: Ценовой фильтр каталога
+        :param seen_skus: Уже собранные идентификаторы, пополняется по мере получения страниц
+        :param semaphore: Ограничение кол-ва одновременных запросов
+        :param on_skus: Вызывается с новыми идентификаторами каждой полученной страницы
+
+        :return: Новые идентификаторы в порядке страниц
+        """
+
+        pages = list(generate_pages_for_filter(catalog_filter, self.shard, self.query, self.xsubject, self.catalog_type, self.brand_id))
+        pages_skus: dict[int, list[int]] = {}
+        last_page = len(pages)
+        next_page = 0
+
+        async def fetch_pages():
+            nonlocal last_page, next_page
+            while next_page < last_page:
+                page = next_page
+                next_page += 1
+                page_skus = await self.fetch_product_skus(pages[page], client, proxies, semaphore)
+                if page_skus is None:
+                    continue
+                if len(page_skus) < PAGE_SIZE:
+                    last_page = min(last_page, page + 1)
+                pages_skus[page] = [sku for sku in page_skus if sku not in seen_skus]
+                seen_skus.update(pages_skus[page])
+                if on_skus is not None and pages_skus[page]:
+                    await on_skus(pages_skus[page])
+
+        await gather(*(fetch_pages() for _ in range(PARSER_PAGES_CONCURRENCY)))
+        return [sku for page in sorted(pages_skus) for sku in pages_skus[page]]
+
+    async def fetch_product_skus(
             self,
             page_address: str,
-            session: ClientSession,
-            proxies: ProxiesPool
-    ) -> AsyncIterable[int]:
+            client: HttpClient,
+            proxies: ProxiesPool,
+            semaphore: Semaphore | None = None
+    ) -> list[int] | None:
+        """
+        Получение идентификаторов продуктов со страницы каталога.
+
+        :return: Идентификаторы продуктов или None, если страницу получить не удалось
+        """
+
         try:
-            response_json, new_address = await self.fetch_json_response(session, page_address, proxies)
+            if semaphore is None:
+                response_json, new_address = await self.fetch_json_response(client, page_address, proxies)
+            else:
+                async with semaphore:
+                    response_json, new_address = await self.fetch_json_response(client, page_address, proxies)
 
             products = response_json \
                 .get('data', {}) \
                 .get('products', [])
 
-            for product in products:
-                yield product['id']
+            return [product['id'] for product in products]
 
         except Exception as e:
             log.error(f'Ошибка парсинга страницы {page_address}. {type(e)}: {e}')
+            return None
+
+    def start_parsing(self):
+        """
+        Начало сбора продуктов каталога: сброс счетчиков и фиксация времени начала.
+        Продукты передаются на сбор по мере обнаружения, до завершения обнаружения
+        каталог не считается собранным.
+        """
 
-    async def parse(
-            self,
-            session: ClientSession,
-            proxies: ProxiesPool,
-            user_settings: str,
-            start_time: str
-    ):
         log.info(f'Начало парсинга {self.name}')
+        self.start_time = datetime_product()
+        self.parsed_items_count = 0
+        self.pending_items_count = 0
+        self.discovery_finished = False
+        self.batch_cards_count = 0
+        self.batch_orders_count = 0
+        self.failed_skus = set()
 
-        catalog_products_coroutines = []
-        for sku in self.skus_pool:
-            catalog_products_coroutines.append(
-                Product.parse(
-                    session=session,
-                    proxies=proxies,
-                    sku=sku,
-                    user_settings=user_settings,
-                    catalog_name=self.name,
-                    start_time=start_time
-                )
-            )
+    def product_parsed(self, sku: int, product: Product | None) -> bool:
+        """
+        Учет обработанного продукта каталога.
+
+        :param sku: Идентификатор продукта
+        :param product: Собранный продукт, None если при сборе возникла ошибка
+
+        :return: True, если обнаружение завершено и обработаны все продукты каталога
+        """
+
+        if product is not None and product.status:
+            self.parsed_items_count += 1
+        else:
+            self.failed_skus.add(sku)
+        self.pending_items_count -= 1
+        return self.pending_items_count == 0 and self.discovery_finished
+
+    def retry_parsing(self):
+        """
+        Подготовка к повторному парсингу: все переданные на сбор продукты, кроме
+        несобранных, уже выведены в отчет и повторно не собираются.
+        """
 
-        catalog_parsed_products = await gather_with_concurrency(45, *catalog_products_coroutines)
-        catalog_successful_parsed_products = [product for product in catalog_parsed_products if product.status]
-        self.parsed_items += catalog_successful_parsed_products
-        parsed_items_count = len(catalog_successful_parsed_products)
+        self.parsed_skus = set(self.skus_pool) - self.failed_skus
+        self.failed_skus = set()
+
+    def finish_parsing(self):
+        """Итоги сбора продуктов каталога."""
+
+        parsed_items_count = self.parsed_items_count
+        log.info(f'Получено пакетно карточек: {self.batch_cards_count}/{len(self.skus_pool)}, '
+                 f'кол-в заказов: {self.batch_orders_count}/{len(self.skus_pool)} для каталога {self.name}')
 
         if parsed_items_count == 0 and self.total_items_count > 100:
             if self.status is CatalogStatus.DONE:
@@ -230,20 +425,8 @@ class Catalog:
                      f'({collected:.2f}%) продуктов')
 
         if self.total_items_count > 0:
-            self.parsed_items_count = parsed_items_count
             self.parsed_items_percentages = parsed_items_count / self.total_items_count * 100
 
         log.info(f'Конец парсинга {self.name}. Собрано {parsed_items_count}/{self.total_items_count} '
                  f'({self.parsed_items_percentages:.2f}%) продуктов')
 
-
-async def gather_with_concurrency(count, *coroutines):
-    semaphore = Semaphore(count)
-
-    async def coroutine_semaphore(coroutine):
-        async with semaphore:
-            return await coroutine
-
-    return await tqdm.gather(*(coroutine_semaphore(coroutine) for coroutine in coroutines))
-
-
@@ -1,55 +1,49 @@
 from __future__ import annotations
-import json
+from asyncio import gather, Semaphore
+from functools import partial
 from urllib.parse import urlparse, parse_qs
 import csv
-from requests import Session as ClientSession
-from core.utils import catalog_groups
+from core.client.HttpClient import HttpClient
+from core.utils import catalog_groups, get_menu, load_partitions, save_partitions
 from core.data.Catalog import Catalog
+from core.data.CatalogFilter import CatalogFilter
 from core.data.CatalogStatus import CatalogStatus, CatalogType
+from core.data.ProductsScheduler import ProductsScheduler
+from core.data.ProductsSink import ProductsSink
+from core.data.RunJournal import RunJournal
+from core.data.QueryVariantCache import query_variants
 from core.proxies.ProxiesPool import ProxiesPool
-from core.utils import datetime_product, api_user_settings, api_default_header, serialize_products, catalogs, brands, _filepath
+from core.utils import api_user_settings, api_default_header, catalogs, brands, _filepath, \
+    PARSER_PREPARE_CONCURRENCY, PARSER_PREPARE_REQUESTS_LIMIT
 from core.logs import logger as log
 
+_DEFAULT_USER_SETTINGS = 'appType=1&curr=rub&dest=-1255987&regions=80,38,4,64,83,33,68,70,69,30,86,75,40,1,66,110,22,31,48,71,114&spp=0'
+
 
 class CatalogsPool:
-    def __init__(self,menu: dict, ifBySkuList: bool):
+    def __init__(self, ifBySkuList: bool, menu: dict | None = None):
         self.catalogs_pool: list[Catalog] = []
         self.retry_catalogs_pool: list[Catalog] = []
-        self.menu = menu
+        self._menu = menu
         if not ifBySkuList:
             self.load_from_file()
             self.load_brands_from_file()
 
     async def prepare_catalogs(
             self,
-            session: ClientSession,
+            client: HttpClient,
             proxies: ProxiesPool,
             is_retry: bool = False,
-            ifBySkuList: bool = False
+            ifBySkuList: bool = False,
+            journal: RunJournal | None = None
     ):
         log.info('Подготовка каталогов')
         if not ifBySkuList:
-            for catalog in self.retry_catalogs_pool if is_retry else self.catalogs_pool:
-                await catalog.prepare_catalog(session, proxies)
+            partitions = load_partitions()
+            prepared_catalogs = self.retry_catalogs_pool if is_retry else self.catalogs_pool
+            await self.prepare_concurrently(client, proxies, prepared_catalogs, partitions, journal=journal)
             log.info('Каталоги подготовлены')
-            with open(
-                _filepath("skus_id.csv"), 'a', newline='', encoding='utf-8'
-                ) as f:
-                writer = csv.writer(f, delimiter=';')
-                skus = [['catalog_name','sku']]
-                for catalog in self.catalogs_pool:
-                    for sku in catalog.skus_pool:
-                        skus.append([catalog.name, sku])
-                #skus = self.remove_duplicates_by_id(skus)
-                writer.writerows(skus)
-            with open(
-                _filepath("catalogs_status.csv"), 'a', newline='', encoding='utf-8'
-                ) as f:
-                writer = csv.writer(f, delimiter=';')
-                skus = []
-                for catalog in self.catalogs_pool:
-                    skus.append([catalog.name, catalog.total_items_count, catalog.total_items_count_percent])
-                writer.writerows(skus)
+            self.save_prepared(prepared_catalogs)
         else:
             for group in catalog_groups():
                 group_name, group_data = group
@@ -61,6 +55,134 @@ class CatalogsPool:
                 )
             log.info('Каталоги подготовлены')
 
+    def save_prepared(self, prepared_catalogs: list[Catalog]):
+        """
+        Сохранение результатов подготовки: фильтров каталогов для следующего запуска,
+        идентификаторов продуктов и статусов каталогов.
+
+        :param prepared_catalogs: Подготовленные каталоги
+        """
+
+        log.info(str(query_variants))
+        save_partitions({
+            catalog.partition_key: catalog.partitions()
+            for catalog in prepared_catalogs
+            if catalog.status is not CatalogStatus.FAILURE and catalog.filters_pool
+        })
+        with open(
+            _filepath("skus_id.csv"), 'a', newline='', encoding='utf-8'
+            ) as f:
+            writer = csv.writer(f, delimiter=';')
+            skus = [['catalog_name','sku']]
+            for catalog in self.catalogs_pool:
+                for sku in catalog.skus_pool:
+                    skus.append([catalog.name, sku])
+            #skus = self.remove_duplicates_by_id(skus)
+            writer.writerows(skus)
+        with open(
+            _filepath("catalogs_status.csv"), 'a', newline='', encoding='utf-8'
+            ) as f:
+            writer = csv.writer(f, delimiter=';')
+            skus = []
+            for catalog in self.catalogs_pool:
+                skus.append([catalog.name, catalog.total_items_count, catalog.total_items_count_percent])
+            writer.writerows(skus)
+
+    async def stream(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            journal: RunJournal | None = None,
+            is_retry: bool = False
+    ):
+        """
+        Потоковый сбор: идентификаторы продуктов со страниц каталогов сразу передаются
+        на сбор продуктов, не дожидаясь подготовки всех каталогов.
+        Если сбор не успевает, очереди заполняются и подготовка каталогов замедляется.
+
+        При повторном парсинге каталоги `retry_catalogs_pool` подготавливаются заново,
+        а уже выведенные в них продукты не собираются повторно.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param journal: Журнал запуска
+        :param is_retry: Повторный парсинг каталогов, собранных менее чем на 90%
+        """
+
+        log.info('Потоковая подготовка и парсинг каталогов')
+        prepared_catalogs = self.retry_catalogs_pool if is_retry else self.catalogs_pool
+        if is_retry:
+            for catalog in prepared_catalogs:
+                catalog.status = CatalogStatus.DONE
+        partitions = load_partitions()
+        user_settings = await get_user_settings(client, proxies)
+        scheduler = ProductsScheduler(client, proxies, user_settings, ProductsSink(journal=journal), journal=journal)
+        await scheduler.run(
+            self.prepare_concurrently(client, proxies, prepared_catalogs, partitions, scheduler, journal, is_retry),
+            lambda catalog: self.catalog_parsed(catalog, is_retry)
+        )
+        log.info('Каталоги подготовлены')
+        if not is_retry:
+            self.save_prepared(self.catalogs_pool)
+
+    @staticmethod
+    async def prepare_concurrently(
+            client: HttpClient,
+            proxies: ProxiesPool,
+            prepared_catalogs: list[Catalog],
+            partitions: dict[str, list[CatalogFilter]],
+            scheduler: ProductsScheduler | None = None,
+            journal: RunJournal | None = None,
+            is_retry: bool = False
+    ):
+        """
+        Параллельная подготовка каталогов.
+        Одновременно готовится не более PARSER_PREPARE_CONCURRENCY каталогов,
+        все их запросы делят общий лимит PARSER_PREPARE_REQUESTS_LIMIT.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param prepared_catalogs: Каталоги для подготовки
+        :param partitions: Фильтры каталогов из прошлого запуска
+        :param scheduler: Сбор продуктов, которому передаются идентификаторы по мере получения страниц
+        :param journal: Журнал запуска: подготовленные в нем каталоги восстанавливаются без запросов
+        :param is_retry: Повторная подготовка: каталоги не восстанавливаются из журнала
+        """
+
+        catalogs_semaphore = Semaphore(PARSER_PREPARE_CONCURRENCY)
+        requests_semaphore = Semaphore(PARSER_PREPARE_REQUESTS_LIMIT)
+        prepared_count = 0
+
+        async def prepare_catalog(catalog: Catalog):
+            nonlocal prepared_count
+            async with catalogs_semaphore:
+                if scheduler is not None:
+                    catalog.start_parsing()
+                try:
+                    if not is_retry and journal is not None and journal.restore_catalog(catalog):
+                        if scheduler is not None:
+                            await scheduler.submit(catalog, catalog.skus_pool)
+                    else:
+                        await catalog.prepare_catalog(
+                            client,
+                            proxies,
+                            partitions.get(catalog.partition_key),
+                            requests_semaphore,
+                            partial(scheduler.submit, catalog) if scheduler is not None else None
+                        )
+                        if journal is not None and catalog.status is not CatalogStatus.FAILURE:
+                            journal.catalog_prepared(catalog)
+                except Exception as e:
+                    catalog.status = CatalogStatus.FAILURE
+                    log.error(f'Ошибка подготовки каталога {catalog.name}. {type(e)}: {e}')
+                finally:
+                    if scheduler is not None:
+                        scheduler.finish_discovery(catalog)
+            prepared_count += 1
+            log.info(f'Подготовлено каталогов: {prepared_count}/{len(prepared_catalogs)}')
+
+        await gather(*(prepare_catalog(catalog) for catalog in prepared_catalogs))
+
     def remove_duplicates_by_id(self,data):
         seen_ids = set()
         result = []
@@ -116,22 +238,35 @@ class CatalogsPool:
 
     async def parse(
             self,
-            session: ClientSession,
+            client: HttpClient,
             proxies: ProxiesPool,
-            is_retry: bool = False
+            is_retry: bool = False,
+            journal: RunJournal | None = None
     ):
-        user_settings = await get_user_settings(session, proxies)
-        for catalog in self.next_catalog(is_retry):
-            await catalog.parse(session, proxies, user_settings, datetime_product())
-            if catalog.parsed_items_percentages < 90 and not is_retry:
-                # catalog.clear()
-                log.critical(f'Запланирован повторный парсинг: {str(catalog)}')
-                catalog.status = CatalogStatus.FAILURE
-                self.retry_catalogs_pool.append(catalog)
-                continue
-            serialize_products(catalog.parsed_items)
-            # if catalog.total_items_count > 500:
-            #     await proxies.refresh(session)
+        user_settings = await get_user_settings(client, proxies)
+        scheduler = ProductsScheduler(client, proxies, user_settings, ProductsSink(journal=journal), journal=journal)
+        await scheduler.parse(self.next_catalog(is_retry), lambda catalog: self.catalog_parsed(catalog, is_retry))
+
+    def catalog_parsed(self, catalog: Catalog, is_retry: bool):
+        if catalog.parsed_items_percentages < 90 and not is_retry:
+            # catalog.clear()
+            log.critical(f'Запланирован повторный парсинг: {str(catalog)}')
+            catalog.status = CatalogStatus.FAILURE
+            catalog.retry_parsing()
+            self.retry_catalogs_pool.append(catalog)
+            return
+        if catalog.parsed_items_percentages < 90:
+            log.critical(f'Каталог собран не полностью после повторного парсинга: {str(catalog)}')
+        catalog.failed_skus = set()
+        catalog.parsed_skus = set()
+
+    @property
+    def menu(self) -> dict:
+        """Индекс меню WB, загружается при первом обращении (нужен только для каталогов)."""
+
+        if self._menu is None:
+            self._menu = get_menu()
+        return self._menu
 
     def get_menu_item(self, address):
         path = urlparse(address).path
@@ -145,20 +280,15 @@ class CatalogsPool:
 
 
 async def get_user_settings(
-        session: ClientSession,
+        client: HttpClient,
         proxies: ProxiesPool
 ) -> str | None:
     try:
-        proxy = proxies.get_random_proxy()
-        prox = proxy.as_string()
-        session.proxies.update(prox)
-        with session.post(
-                url=api_user_settings(),
-                headers=api_default_header(),
-                verify=False
-                #proxies=proxies.get_random_proxy().as_string()
-        ) as response:
-            response_json = json.loads(response.text)
-            return await response_json.get('xinfo')
+        response = await client.post(
+            api_user_settings(),
+            proxy=proxies.get_random_proxy(),
+            headers=api_default_header()
+        )
+        return response.json().get('xinfo') or _DEFAULT_USER_SETTINGS
     except:
-        return 'appType=1&curr=rub&dest=-1255987&regions=80,38,4,64,83,33,68,70,69,30,86,75,40,1,66,110,22,31,48,71,114&spp=0'
+        return _DEFAULT_USER_SETTINGS
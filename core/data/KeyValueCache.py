@@ -0,0 +1,173 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+from asyncio import CancelledError, Future, get_running_loop, shield
+from collections import OrderedDict
+from time import time
+from typing import Any, Awaitable, Callable
+
+from core.logs import logger as log
+
+
+class KeyValueCache:
+    """
+    LRU-кэш значений в памяти с необязательным хранением в SQLite между запусками.
+    Значения старше `ttl_secs` считаются отсутствующими.
+
+    Одновременные запросы одного ключа объединяются: значение получается один раз,
+    остальные ожидают его результат.
+
+    :param name: Наименование кэша для статистики, оно же имя таблицы в файле
+    :param max_size: Максимальное кол-во значений в памяти
+    :param path: Путь к файлу SQLite, пустая строка - только память
+    :param ttl_secs: Срок жизни значения, None - без ограничения
+    :param commit_every: Кол-во изменений, после которого они сохраняются на диск
+    """
+
+    def __init__(
+            self,
+            name: str,
+            max_size: int = 50_000,
+            path: str = '',
+            ttl_secs: float | None = None,
+            commit_every: int = 500
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.path = path
+        self.ttl_secs = ttl_secs
+        self.commit_every = commit_every
+        # Значение и время его получения
+        self.values: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.in_flight: dict[str, Future] = {}
+        self.connection: sqlite3.Connection | None = None
+        self.pending_changes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def connect(self) -> sqlite3.Connection | None:
+        if self.connection is not None or not self.path:
+            return self.connection
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.name}" '
+                f'(key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)'
+            )
+        except sqlite3.Error as e:
+            log.error(f'Ошибка открытия кэша {self.name} ({self.path}), используется только память. {type(e)}: {e}')
+            self.path = ''
+            self.connection = None
+        return self.connection
+
+    def get(self, key: str) -> Any | None:
+        """
+        Значение по ключу из памяти или с диска.
+
+        :param key: Ключ значения
+
+        :return: Значение, None если его нет в кэше
+        """
+
+        if key in self.values:
+            value, stored_at = self.values[key]
+            if not self.expired(stored_at):
+                self.values.move_to_end(key)
+                return value
+            del self.values[key]
+        connection = self.connect()
+        if connection is None:
+            return None
+        row = connection.execute(f'SELECT value, stored_at FROM "{self.name}" WHERE key = ?', (key,)).fetchone()
+        if row is None or self.expired(row[1]):
+            return None
+        value = json.loads(row[0])
+        self.remember(key, value, row[1])
+        return value
+
+    def expired(self, stored_at: float) -> bool:
+        return self.ttl_secs is not None and time() - stored_at > self.ttl_secs
+
+    def set(self, key: str, value: Any):
+        stored_at = time()
+        self.remember(key, value, stored_at)
+        connection = self.connect()
+        if connection is None:
+            return
+        connection.execute(
+            f'INSERT OR REPLACE INTO "{self.name}" VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), stored_at)
+        )
+        self.pending_changes += 1
+        if self.pending_changes >= self.commit_every:
+            self.commit()
+
+    def remember(self, key: str, value: Any, stored_at: float):
+        self.values[key] = (value, stored_at)
+        self.values.move_to_end(key)
+        if len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any | None:
+        """
+        Значение по ключу, при отсутствии в кэше - результат `fetch`.
+        Значение None не сохраняется.
+
+        :param key: Ключ значения
+        :param fetch: Получение значения, вызывается не более одного раза для ожидающих его запросов
+        """
+
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if key in self.in_flight:
+            self.hits += 1
+            future = self.in_flight[key]
+            try:
+                return await shield(future)
+            except CancelledError:
+                # Отменен запрос, получавший значение, а не ожидающий: значение получается заново
+                if not future.cancelled():
+                    raise
+            return await self.get_or_fetch(key, fetch)
+
+        self.misses += 1
+        future = self.in_flight[key] = get_running_loop().create_future()
+        try:
+            value = await fetch()
+        except CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение получают ожидающие запросы, если их нет - оно не должно попасть в лог asyncio
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            if value is not None:
+                self.set(key, value)
+            return value
+        finally:
+            del self.in_flight[key]
+
+    def commit(self):
+        if self.connection is not None and self.pending_changes:
+            self.connection.commit()
+            self.pending_changes = 0
+
+    def close(self):
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __str__(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return f'Кэш {self.name}: попаданий {self.hits}/{total} ({hit_rate:.2f}%), в памяти {len(self.values)}'
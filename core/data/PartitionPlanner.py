@@ -0,0 +1,194 @@
+from __future__ import annotations
+from math import ceil
+
+from core.data.CatalogFilter import CatalogFilter
+from core.utils import PARSER_FILTER_CAPACITY
+
+# Кол-во товаров, при превышении которого прежний алгоритм делил диапазон пополам
+BISECTION_THRESHOLD = 1000
+
+
+class PartitionPlanner:
+    """
+    Выбор точек разбиения ценового диапазона каталога.
+
+    Вместо деления пополам диапазон делится сразу на столько частей, сколько нужно,
+    чтобы каждая часть была близка к лимиту выдачи (`capacity`). Границы частей
+    подбираются по распределению цен: по фильтрам прошлого запуска, если они есть,
+    иначе - равномерно в логарифмической шкале внутри фактического диапазона цен.
+
+    Ответ фильтров содержит только границы цен (`minPriceU`/`maxPriceU`), без
+    распределения товаров по цене. Поэтому при первом запуске точки разбиения
+    выбираются вслепую, и части могут оказаться переполненными или почти пустыми;
+    распределение цен известно только из фильтров прошлого запуска.
+
+    :param capacity: Максимальное кол-во товаров в одном фильтре
+    :param history: Фильтры каталога из прошлого запуска
+    :param fill_factor: Целевая заполненность части относительно `capacity`
+    """
+
+    def __init__(
+            self,
+            capacity: int = PARSER_FILTER_CAPACITY,
+            history: list[CatalogFilter] | None = None,
+            fill_factor: float = 0.8
+    ):
+        self.capacity = capacity
+        self.history = sorted(history or [], key=lambda catalog_filter: catalog_filter.min_price)
+        self.fill_factor = fill_factor
+        self.requests_count = 0
+
+    def is_leaf(self, total: int, min_price: int, max_price: int) -> bool:
+        return total <= self.capacity or max_price - min_price <= 2
+
+    @staticmethod
+    def price_bounds(json_response: dict) -> tuple[int, int] | None:
+        """
+        Фактический диапазон цен из ответа фильтров (`minPriceU`/`maxPriceU`).
+
+        :param json_response: JSON-ответ фильтров
+        """
+
+        for response_filter in json_response.get('data', {}).get('filters', []) or []:
+            if response_filter.get('key') == 'priceU':
+                min_price = response_filter.get('minPriceU')
+                max_price = response_filter.get('maxPriceU')
+                if min_price is not None and max_price is not None:
+                    return int(min_price), int(max_price)
+        return None
+
+    def split(
+            self,
+            min_price: int,
+            max_price: int,
+            total: int,
+            bounds: tuple[int, int] | None = None
+    ) -> list[tuple[int, int]]:
+        """
+        Разбиение диапазона на непересекающиеся части по возрастанию цены.
+        Части за пределами фактического диапазона цен не запрашиваются.
+
+        :param min_price: Минимальная цена диапазона
+        :param max_price: Максимальная цена диапазона
+        :param total: Кол-во товаров в диапазоне
+        :param bounds: Фактический диапазон цен из ответа фильтров
+        """
+
+        low, high = min_price, max_price
+        if bounds is not None:
+            low, high = max(min_price, bounds[0]), min(max_price, bounds[1])
+            if high - low < 0:
+                low, high = min_price, max_price
+
+        parts = max(2, ceil(total / (self.capacity * self.fill_factor)))
+        parts = min(parts, high - low + 1)
+        if parts < 2:
+            return [(low, high)]
+
+        points = self._history_points(low, high, parts) or self._geometric_points(low, high, parts)
+        edges = [low - 1, *sorted(set(point for point in points if low <= point < high)), high]
+        return [(edges[i] + 1, edges[i + 1]) for i in range(len(edges) - 1)]
+
+    @staticmethod
+    def _geometric_points(low: int, high: int, parts: int) -> list[int]:
+        start = max(low, 1)
+        ratio = (max(high, start + 1) / start) ** (1 / parts)
+        return [int(start * ratio ** i) for i in range(1, parts)]
+
+    def _history_points(self, low: int, high: int, parts: int) -> list[int]:
+        expected = self.expected_count(low, high)
+        if expected <= 0:
+            return []
+        points, target, accumulated = [], expected / parts, 0.0
+        for catalog_filter in self.history:
+            left = max(low, catalog_filter.min_price)
+            right = min(high, catalog_filter.max_price)
+            if right < left:
+                continue
+            width = catalog_filter.max_price - catalog_filter.min_price + 1
+            density = catalog_filter.total_items / width
+            count = density * (right - left + 1)
+            while len(points) < parts - 1 and accumulated + count >= target * (len(points) + 1):
+                needed = target * (len(points) + 1) - accumulated
+                points.append(left + int(needed / density) if density else left)
+            accumulated += count
+        return points
+
+    def expected_count(self, min_price: int, max_price: int) -> float:
+        """
+        Ожидаемое кол-во товаров в диапазоне по фильтрам прошлого запуска.
+        Внутри фильтра цены считаются распределенными равномерно.
+
+        :param min_price: Минимальная цена диапазона
+        :param max_price: Максимальная цена диапазона
+        """
+
+        expected = 0.0
+        for catalog_filter in self.history:
+            left = max(min_price, catalog_filter.min_price)
+            right = min(max_price, catalog_filter.max_price)
+            if right < left:
+                continue
+            width = catalog_filter.max_price - catalog_filter.min_price + 1
+            expected += catalog_filter.total_items * (right - left + 1) / width
+        return expected
+
+    @staticmethod
+    def cover(
+            catalog_filters: list[CatalogFilter],
+            min_price: int,
+            max_price: int
+    ) -> list[CatalogFilter]:
+        """
+        Растягивает фильтры так, чтобы они без пропусков покрывали весь диапазон.
+        Пропуски между фильтрами не содержат товаров, поэтому кол-во товаров не меняется.
+
+        :param catalog_filters: Фильтры по возрастанию цены
+        :param min_price: Минимальная цена корневого диапазона
+        :param max_price: Максимальная цена корневого диапазона
+        """
+
+        covered = []
+        for index, catalog_filter in enumerate(catalog_filters):
+            is_last = index == len(catalog_filters) - 1
+            covered.append(
+                CatalogFilter(
+                    name=catalog_filter.name,
+                    total_pages=catalog_filter.total_pages,
+                    total_items=catalog_filter.total_items,
+                    min_price=min_price if index == 0 else catalog_filter.min_price,
+                    max_price=max_price if is_last else catalog_filters[index + 1].min_price - 1
+                )
+            )
+        return covered
+
+    def bisection_requests(
+            self,
+            catalog_filters: list[CatalogFilter],
+            min_price: int,
+            max_price: int,
+            threshold: int = BISECTION_THRESHOLD
+    ) -> int:
+        """
+        Оценка кол-ва запросов фильтров прежним алгоритмом: деление диапазона пополам,
+        пока в части больше `threshold` товаров. Моделируется на найденном распределении
+        цен (внутри фильтра - равномерном), поэтому результат приблизительный.
+
+        :param catalog_filters: Найденные фильтры каталога
+        :param min_price: Минимальная цена корневого диапазона
+        :param max_price: Максимальная цена корневого диапазона
+        :param threshold: Кол-во товаров, при превышении которого диапазон делится
+        """
+
+        estimator = PartitionPlanner(self.capacity, catalog_filters)
+        requests_count = 0
+        stack = [(min_price, max_price)]
+        while stack:
+            low, high = stack.pop()
+            requests_count += 1
+            total = round(estimator.expected_count(low, high))
+            if total > threshold and high - low > 2:
+                middle = (low + high) // 2
+                stack.append((low, middle))
+                stack.append((middle + 1, high))
+        return requests_count
@@ -1,8 +1,11 @@
 from __future__ import annotations
-from requests import Session as ClientSession, ConnectionError as ClientProxyConnectionError
-
-import json
+from asyncio import gather
+from copy import copy
+from aiohttp import ClientProxyConnectionError
 
+from core.client.HttpClient import HttpClient
+from core.data.SellerResolver import sellers
+from core.data.SubCatalogResolver import sub_catalogs
 from core.proxies.ProxiesPool import ProxiesPool
 from core.utils import *
 from core.logs import logger as log
@@ -24,30 +27,38 @@ class Product:
         self.sold_qty     : int | None  = None
         self.sub_catalog  : str         = ''
         self.catalog_name : str         = ''
+        self.catalog_key  : str         = ''
         self.merchant_name: str         = ''
         self.merchant_ogrn: str         = ''
+        self.supplier_id  : int | None  = None
         self.subject      : str | None  = None
         self.ean          : str         = ''
         self.status       : bool        = True
 
     @staticmethod
     async def parse(
-            session: ClientSession,
+            client: HttpClient,
             proxies: ProxiesPool,
             sku: int,
             user_settings: str,
             catalog_name: str,
-            start_time: str
+            start_time: str,
+            card_json: dict | None = None,
+            sold_qty: int | None = None,
+            catalog_key: str = ''
     ):
         """
         Получение информации о продукте.
 
-        :param session: Сессия для создания HTTP-запросов
+        :param client: Клиент для создания HTTP-запросов
         :param proxies: Пул прокси для создания HTTP-запросов
         :param sku: Идентификатор продукта
         :param user_settings: Пользовательские настройки
         :param catalog_name: Наименование каталога
         :param start_time: Дата и время начала парсинга
+        :param card_json: Карточка продукта, полученная пакетным запросом
+        :param sold_qty: Кол-во заказов, полученное пакетным запросом
+        :param catalog_key: Ключ каталога в журнале запуска
 
         :return::class:`Product` Заполненный продукт
         """
@@ -55,109 +66,251 @@ class Product:
         product = Product(sku)
         product.date_parse = start_time
         product.catalog_name = catalog_name
+        product.catalog_key = catalog_key
         product.date_create = datetime_product()
 
+        # Карточка нужна остальным запросам: если ее получить не удалось, они не выполняются
+        await product.fetch_card(client, proxies, user_settings, card_json)
+        if not product.status:
+            return product
+
+        async def sub_catalog():
+            # Подкаталог зависит от бренда (карточка) и предмета (card.json)
+            await product.fetch_static(client, proxies)
+            if product.status:
+                await product.fetch_sub_catalog(client, proxies)
+
+        await gather(
+            sub_catalog(),
+            product.fetch_merchant(client, proxies),
+            product.fetch_orders(client, proxies, sold_qty)
+        )
+
+        return product
+
+    @staticmethod
+    async def fetch_cards(
+            client: HttpClient,
+            proxies: ProxiesPool,
+            user_settings: str,
+            skus: list[int]
+    ) -> dict[int, dict]:
+        """
+        Пакетное получение карточек продуктов.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param user_settings: Пользовательские настройки
+        :param skus: Идентификаторы продуктов
+
+        :return: Карточки продуктов по идентификатору. Отсутствующих в ответе продуктов в словаре нет
+        """
+
+        try:
+            cards_response = await client.get(api_product_cards(user_settings, skus), proxy=proxies.get_random_proxy())
+            if cards_response.status_code != 200:
+                return {}
+            products = cards_response.json().get('data', {}).get('products', [])
+            return {item['id']: item for item in products if 'id' in item}
+        except Exception as e:
+            log.error(f'Ошибка пакетного получения карточек ({len(skus)} шт.). {type(e)}: {e}')
+            return {}
+
+    @staticmethod
+    async def fetch_orders_counts(
+            client: HttpClient,
+            proxies: ProxiesPool,
+            skus: list[int]
+    ) -> dict[int, int]:
+        """
+        Пакетное получение кол-ва заказов продуктов.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param skus: Идентификаторы продуктов
+
+        :return: Кол-во заказов по идентификатору. Отсутствующих в ответе продуктов в словаре нет
+        """
+
+        try:
+            orders_response = await client.get(api_products_orders(skus), proxy=proxies.get_random_proxy())
+            if orders_response.status_code != 200:
+                return {}
+            orders_json = orders_response.json()
+            if not isinstance(orders_json, list):
+                return {}
+            return {item['nmId']: item.get('qnt', 0) for item in orders_json if 'nmId' in item}
+        except Exception as e:
+            log.error(f'Ошибка пакетного получения кол-ва заказов ({len(skus)} шт.). {type(e)}: {e}')
+            return {}
+
+    async def fetch_card(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            user_settings: str,
+            card_json: dict | None = None
+    ):
+        """
+        Получение цен, бренда, остатков и оценок из карточки продукта.
+        Если карточка уже получена пакетным запросом, запрос не выполняется.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param user_settings: Пользовательские настройки
+        :param card_json: Карточка продукта, полученная пакетным запросом
+        """
+
+        if card_json is not None:
+            self.extract_price__brand__title(card_json)
+            self.extract_quantity_feedbacks(card_json)
+            return
+
+        proxy = None
         try:
             proxy = proxies.get_random_proxy()
-            with session.get(
-                    api_product_card(user_settings, sku),
-                    verify=False,
-                    proxies=proxy.as_string()
-            ) as card_response:
-                card_response_text = card_response.text
-                card_response_json = json.loads(card_response_text)
-                products = card_response_json.get('data', {}).get('products', [])
-                del card_response_text, card_response_json
-                for item in products:
-                    product.extract_price__brand__title(item)
-                    product.extract_quantity_feedbacks(item)
-
-                try:
-                    proxy = proxies.get_random_proxy()
-                    prox = proxy.as_string()
-                    session.proxies.update(prox)
-                    with session.get(
-                            api_product_info_new(sku),
-                            verify=False
-                            #proxies=proxy.as_string()
-                    ) as static_response:
-                        if static_response.status_code == 200:
-                            static_response_text = static_response.text
-                            static_response_json = json.loads(static_response_text)
-                            product.extract_full_name__subject__ean(static_response_json)
-                            del static_response_text, static_response_json
-                except ClientProxyConnectionError as e:
-                    log.error(f'Ошибка парсинга {sku}, не удалось собрать данные. {type(e)}: {e}')
-                    product.status = False
-                    if proxy:
-                        proxies.disable(proxy)
-                except Exception as e:
-                    log.error(f'Ошибка парсинга {sku}, не удалось собрать данные. {type(e)}: {e}')
-                    product.status = False
-                    return product
-
-                try:
-                    proxy = proxies.get_random_proxy()
-                    prox = proxy.as_string()
-                    session.proxies.update(prox)
-                    with session.get(
-                            api_merchant_info(sku),
-                            verify=False
-                            #proxies=proxies.get_random_proxy().as_string()
-                    ) as merchant_response:
-                        if merchant_response.status_code == 200:
-                            merchant_response_text = merchant_response.text
-                            merchant_response_json = json.loads(merchant_response_text)
-                            product.extract_merchant(merchant_response_json)
-                            del merchant_response_text, merchant_response_json
-                except Exception as e:
-                    log.error(f'Ошибка парсинга {sku}, не удалось собрать продавца. {type(e)}: {e}')
-
-                try:
-                    proxy = proxies.get_random_proxy()
-                    prox = proxy.as_string()
-                    session.proxies.update(prox)
-                    with session.get(
-                            api_product_info(sku, product.subject, product.brand_id),
-                            verify=False,
-                            headers=api_default_header()
-                            #proxies=proxies.get_random_proxy().as_string()
-                    ) as info_response:
-                        if info_response.status_code == 200:
-                            info_response_text = info_response.text
-                            info_response_json = json.loads(info_response_text)
-                            product.extract_sub_catalog(info_response_json)
-                            del info_response_text, info_response_json
-                except Exception as e:
-                    log.error(f'Ошибка парсинга {sku}, не удалось собрать подкаталог. {type(e)}: {e}')
-
-                try:
-                    proxy = proxies.get_random_proxy()
-                    prox = proxy.as_string()
-                    session.proxies.update(prox)
-                    with session.get(
-                            api_product_orders(sku),
-                            verify=False
-                            #proxies=proxies.get_random_proxy().as_string()
-                    ) as orders_response:
-                        if orders_response.status_code == 200:
-                            orders_response_text = orders_response.text
-                            orders_response_json = json.loads(orders_response_text)
-                            product.extract_orders(orders_response_json)
-                            del orders_response_text, orders_response_json
-                except Exception as e:
-                    log.error(f'Ошибка парсинга {sku}, не удалось собрать кол-во продаж. {type(e)}: {e}')
-                    product.sold_qty = 0
+            card_response = await client.get(
+                api_product_card(user_settings, self.sku),
+                proxy=proxy,
+                record_concurrency=True
+            )
+            products = card_response.json().get('data', {}).get('products', [])
+            for item in products:
+                self.extract_price__brand__title(item)
+                self.extract_quantity_feedbacks(item)
         except ClientProxyConnectionError as e:
-            log.error(f'Ошибка парсинга {sku}, не удалось собрать данные. {type(e)}: {e}')
-            product.status = False
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать данные. {type(e)}: {e}')
+            self.status = False
             if proxy:
-                proxy.disable()
+                proxies.disable(proxy)
         except Exception as e:
-            log.error(f'Ошибка парсинга {sku}, не удалось собрать данные. {type(e)}: {e}')
-            product.status = False
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать данные. {type(e)}: {e}')
+            self.status = False
 
-        return product
+    async def fetch_static(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool
+    ):
+        """
+        Получение полного наименования, предмета и EAN-кода из card.json.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        """
+
+        proxy = None
+        try:
+            proxy = proxies.get_random_proxy()
+            status_code, static_json = await client.get_cached_json(
+                api_product_info_new(self.sku),
+                proxy=proxy,
+                reduce=Product.reduce_static,
+                record_concurrency=True
+            )
+            if status_code == 200:
+                self.extract_full_name__subject__ean(static_json)
+        except ClientProxyConnectionError as e:
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать данные. {type(e)}: {e}')
+            self.status = False
+            if proxy:
+                proxies.disable(proxy)
+        except Exception as e:
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать данные. {type(e)}: {e}')
+            self.status = False
+
+    async def fetch_merchant(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool
+    ):
+        """
+        Получение продавца из sellers.json.
+        sellers.json запрашивается один раз для продавца, см. :class:`SellerResolver`.
+        HTTP-кэш считает файл свежим не дольше срока кэша продавцов.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        """
+
+        async def fetch() -> dict | None:
+            status_code, merchant_json = await client.get_cached_json(
+                api_merchant_info(self.sku),
+                proxy=proxies.get_random_proxy(),
+                reduce=Product.reduce_merchant,
+                record_concurrency=True,
+                ttl_secs=sellers.cache.ttl_secs
+            )
+            return merchant_json if status_code == 200 else None
+
+        try:
+            merchant_json = await sellers.resolve(self.supplier_id, fetch)
+            if merchant_json is not None:
+                self.extract_merchant(merchant_json)
+        except Exception as e:
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать продавца. {type(e)}: {e}')
+
+    async def fetch_sub_catalog(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool
+    ):
+        """
+        Получение подкаталога. Требует заполненных `subject` и `brand_id`.
+        Подкаталог запрашивается один раз для пары предмет-бренд, см. :class:`SubCatalogResolver`.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        """
+
+        async def fetch() -> str | None:
+            info_response = await client.get(
+                api_product_info(self.sku, self.subject, self.brand_id),
+                proxy=proxies.get_random_proxy(),
+                headers=api_default_header(),
+                record_concurrency=True
+            )
+            if info_response.status_code != 200:
+                return None
+            return self.extract_sub_catalog(info_response.json()) or ''
+
+        try:
+            sub_catalog = await sub_catalogs.resolve(self.subject, self.brand_id, fetch)
+            if sub_catalog:
+                self.sub_catalog = sub_catalog
+        except Exception as e:
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать подкаталог. {type(e)}: {e}')
+
+    async def fetch_orders(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            sold_qty: int | None = None
+    ):
+        """
+        Получение кол-ва заказов.
+        Если кол-во уже получено пакетным запросом, запрос не выполняется.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param proxies: Пул прокси для создания HTTP-запросов
+        :param sold_qty: Кол-во заказов, полученное пакетным запросом
+        """
+
+        if sold_qty is not None:
+            self.sold_qty = sold_qty
+            return
+
+        try:
+            orders_response = await client.get(
+                api_product_orders(self.sku),
+                proxy=proxies.get_random_proxy(),
+                record_concurrency=True
+            )
+            if orders_response.status_code == 200:
+                self.extract_orders(orders_response.json())
+        except Exception as e:
+            log.error(f'Ошибка парсинга {self.sku}, не удалось собрать кол-во продаж. {type(e)}: {e}')
+            self.sold_qty = 0
 
     @staticmethod
     def get_sub_catalog(
@@ -183,6 +336,7 @@ class Product:
 
         self.brand_id = item_json.get('brandId', 0)
         self.brand_name = item_json.get('brand', '')
+        self.supplier_id = item_json.get('supplierId', None)
 
         self.title = item_json.get('name', '').replace('\n', ' ')
 
@@ -203,6 +357,20 @@ class Product:
             self.ean = skus[0]
         self.subject = data.get('subject_id', None)
 
+    @staticmethod
+    def reduce_static(static_json: dict) -> dict:
+        """
+        Поля card.json, используемые :meth:`extract_full_name__subject__ean`, для HTTP-кэша.
+
+        :param static_json: JSON-ответ сервера
+        """
+
+        data = static_json.get('data', {})
+        return {
+            'imt_name': static_json.get('imt_name', ''),
+            'data': {'skus': data.get('skus', [])[:1], 'subject_id': data.get('subject_id', None)}
+        }
+
     def extract_quantity_feedbacks(self, item_json: dict):
         """
         Извлечение остатков на складах и количества оценок из JSON.
@@ -230,11 +398,23 @@ class Product:
         self.merchant_name = merchant_name
         self.merchant_ogrn = merchant_ogrn
 
-    def extract_sub_catalog(self, info_json: dict | list):
+    @staticmethod
+    def reduce_merchant(merchant_json: dict) -> dict:
+        """
+        Поля sellers.json, используемые :meth:`extract_merchant`, для HTTP-кэша.
+
+        :param merchant_json: JSON-ответ сервера
+        """
+
+        return {key: merchant_json[key] for key in ('supplierName', 'ogrn') if key in merchant_json}
+
+    def extract_sub_catalog(self, info_json: dict | list) -> str | None:
         """
         Извлечение подкаталога из JSON.
 
         :param info_json: JSON-ответ сервера
+
+        :return: Подкаталог, None если его нет в ответе
         """
 
         site_path = info_json.get('value', {}) \
@@ -243,6 +423,7 @@ class Product:
         sub_catalog = self.get_sub_catalog(site_path)
         if sub_catalog:
             self.sub_catalog = sub_catalog
+        return sub_catalog
 
     def extract_orders(self, orders_json: dict | list):
         """
@@ -252,15 +433,84 @@ class Product:
         """
 
         if isinstance(orders_json, list) and len(orders_json):
-            orders = orders_json[0].get('qnt', 0)
+            item = next((item for item in orders_json if item.get('nmId') == self.sku), orders_json[0])
+            orders = item.get('qnt', 0)
             self.sold_qty = orders
 
+    def for_catalog(self, catalog_name: str, date_parse: str, catalog_key: str = '') -> Product:
+        """
+        Копия продукта для вывода в другом каталоге без повторного сбора.
+
+        :param catalog_name: Наименование каталога
+        :param date_parse: Дата и время начала парсинга каталога
+        :param catalog_key: Ключ каталога в журнале запуска
+        """
+
+        product = copy(self)
+        product.catalog_name = catalog_name
+        product.catalog_key = catalog_key
+        product.date_parse = date_parse
+        return product
+
+    def record(self) -> tuple:
+        """
+        Поля продукта, не зависящие от каталога, для хранения собранного продукта
+        до повторного вывода в других каталогах.
+        """
+
+        return (
+            self.sku,
+            self.title,
+            self.full_price,
+            self.sale_price,
+            self.quantity,
+            self.feedbacks,
+            self.brand_name,
+            self.date_create,
+            self.sold_qty,
+            self.sub_catalog,
+            self.merchant_name,
+            self.merchant_ogrn,
+            self.ean
+        )
+
+    @staticmethod
+    def from_record(record: tuple, catalog_name: str, date_parse: str, catalog_key: str = '') -> Product:
+        """
+        Продукт для вывода в каталоге из полей :meth:`record` без повторного сбора.
+
+        :param record: Поля собранного продукта
+        :param catalog_name: Наименование каталога
+        :param date_parse: Дата и время начала парсинга каталога
+        :param catalog_key: Ключ каталога в журнале запуска
+        """
+
+        product = Product(record[0])
+        (
+            _,
+            product.title,
+            product.full_price,
+            product.sale_price,
+            product.quantity,
+            product.feedbacks,
+            product.brand_name,
+            product.date_create,
+            product.sold_qty,
+            product.sub_catalog,
+            product.merchant_name,
+            product.merchant_ogrn,
+            product.ean
+        ) = record
+        product.catalog_name = catalog_name
+        product.catalog_key = catalog_key
+        product.date_parse = date_parse
+        return product
+
     def __iter__(self):
-        self.title = f'{self.brand_name} / {self.title}'
         return iter([
             self.date_parse,
             self.sku,
-            self.title,
+            f'{self.brand_name} / {self.title}',
             self.url,
             self.sale_price,
             self.full_price,
@@ -0,0 +1,278 @@
+from __future__ import annotations
+from asyncio import gather, Queue
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable
+from tqdm import tqdm
+
+from core.client.HttpClient import HttpClient
+from core.data.Catalog import Catalog
+from core.data.Product import Product
+from core.data.ProductsSink import ProductsSink
+from core.data.RunJournal import RunJournal
+from core.proxies.ProxiesPool import ProxiesPool
+from core.utils import chunks, PARSER_CARDS_BATCH_SIZE, PARSER_ORDERS_BATCH_SIZE, PARSER_PRODUCTS_WORKERS, \
+    PARSER_BATCH_PRODUCERS, PARSER_PRODUCTS_CACHE_SIZE
+from core.logs import logger as log
+
+
+class ProductsScheduler:
+    """
+    Общий пул обработчиков продуктов для всех каталогов.
+
+    Продукты каталогов поступают в одну ограниченную очередь пакетами: для каждого
+    пакета сначала запрашиваются карточки и кол-ва заказов. Следующий каталог начинает
+    обрабатываться, не дожидаясь последних продуктов предыдущего, а учет собранных
+    продуктов ведется отдельно по каждому каталогу.
+
+    Каждый продукт собирается один раз за запуск: если он встречается в нескольких
+    каталогах, в остальные выводятся копии собранного продукта. В :meth:`parse` пулы
+    всех каталогов известны заранее, и копии выводятся сразу после сбора продукта.
+    В потоковом режиме (:meth:`run` с :meth:`submit`) каталоги продукта заранее
+    неизвестны, поэтому для повторного вывода хранятся поля :meth:`Product.record`
+    последних `cache_size` собранных продуктов: продукт, вытесненный из кэша
+    до появления в следующем каталоге, собирается повторно.
+
+    :param client: Клиент для создания HTTP-запросов
+    :param proxies: Пул прокси для создания HTTP-запросов
+    :param user_settings: Пользовательские настройки
+    :param sink: Буфер записи собранных продуктов
+    :param workers_count: Кол-во обработчиков продуктов
+    :param producers_count: Кол-во одновременных пакетных запросов
+    :param cache_size: Кол-во хранимых собранных продуктов в потоковом режиме
+    :param journal: Журнал продолжаемого запуска, записанные в нем продукты не собираются заново
+    """
+
+    def __init__(
+            self,
+            client: HttpClient,
+            proxies: ProxiesPool,
+            user_settings: str,
+            sink: ProductsSink,
+            workers_count: int = PARSER_PRODUCTS_WORKERS,
+            producers_count: int = PARSER_BATCH_PRODUCERS,
+            cache_size: int = PARSER_PRODUCTS_CACHE_SIZE,
+            journal: RunJournal | None = None
+    ):
+        self.client = client
+        self.proxies = proxies
+        self.user_settings = user_settings
+        self.sink = sink
+        self.workers_count = workers_count
+        self.producers_count = producers_count
+        self.cache_size = cache_size
+        self.journal = journal
+        self.batches: Queue[tuple[Catalog, list[int]] | None] = Queue(maxsize=producers_count * 2)
+        self.queue: Queue[tuple[Catalog, int, dict | None, int | None] | None] = Queue(maxsize=workers_count * 2)
+        self.on_catalog_done: Callable[[Catalog], None] | None = None
+        self.progress: tqdm | None = None
+        # Собранные продукты и каталоги, ожидающие продукты, которые еще собираются
+        self.parsed: OrderedDict[int, tuple] = OrderedDict()
+        self.in_flight: dict[int, list[Catalog]] = {}
+        # Каталоги, кроме первого, в которых встречается продукт, если пулы известны заранее
+        self.shared: dict[int, list[Catalog]] = {}
+        self.reused_count = 0
+
+    async def parse(
+            self,
+            catalogs: Iterable[Catalog],
+            on_catalog_done: Callable[[Catalog], None] | None = None
+    ):
+        """
+        Сбор продуктов каталогов с подготовленными пулами идентификаторов.
+        Продукт передается на сбор в первом каталоге, в котором он встречается,
+        и после сбора выводится во всех его каталогах.
+
+        :param catalogs: Каталоги для сбора
+        :param on_catalog_done: Вызывается для каталога после обработки всех его продуктов
+        """
+
+        catalogs = list(catalogs)
+        owners: dict[int, Catalog] = {}
+        owned_skus: list[list[int]] = []
+        for catalog in catalogs:
+            catalog.start_parsing()
+            skus = self.fresh_skus(catalog, catalog.skus_pool)
+            catalog.pending_items_count += len(skus)
+            catalog_skus = []
+            for sku in skus:
+                if owners.setdefault(sku, catalog) is catalog:
+                    catalog_skus.append(sku)
+                else:
+                    self.shared.setdefault(sku, []).append(catalog)
+            owned_skus.append(catalog_skus)
+        del owners
+        # Все каталоги продуктов известны, хранить собранные продукты не нужно
+        self.cache_size = 0
+
+        async def feed():
+            for catalog, catalog_skus in zip(catalogs, owned_skus):
+                for batch in chunks(catalog_skus, PARSER_CARDS_BATCH_SIZE):
+                    await self.batches.put((catalog, batch))
+                self.finish_discovery(catalog)
+
+        await self.run(feed(), on_catalog_done)
+
+    async def run(
+            self,
+            feed: Awaitable,
+            on_catalog_done: Callable[[Catalog], None] | None = None
+    ):
+        """
+        Сбор продуктов, которые `feed` передает через :meth:`submit` по мере их обнаружения.
+        Очереди ограничены, поэтому `feed` замедляется, если сбор не успевает.
+
+        :param feed: Источник продуктов каталогов
+        :param on_catalog_done: Вызывается для каталога после обработки всех его продуктов
+        """
+
+        self.on_catalog_done = on_catalog_done
+        self.progress = tqdm()
+
+        async def feed_all():
+            try:
+                await feed
+            finally:
+                for _ in range(self.producers_count):
+                    await self.batches.put(None)
+
+        async def produce_all():
+            try:
+                await gather(*(self.produce() for _ in range(self.producers_count)))
+            finally:
+                for _ in range(self.workers_count):
+                    await self.queue.put(None)
+
+        try:
+            await gather(feed_all(), produce_all(), *(self.work() for _ in range(self.workers_count)))
+        finally:
+            self.progress.close()
+            self.sink.flush()
+        log.info(f'Продуктов выведено без повторного сбора: {self.reused_count}')
+
+    async def submit(self, catalog: Catalog, skus: list[int]):
+        """
+        Передача обнаруженных продуктов каталога на сбор.
+        Каталог должен быть начат :meth:`Catalog.start_parsing`.
+        Продукты, уже выведенные в каталоге до повторного парсинга или записанные
+        в продолжаемом запуске, учитываются как собранные.
+
+        :param catalog: Каталог продуктов
+        :param skus: Идентификаторы продуктов
+        """
+
+        skus = self.fresh_skus(catalog, skus)
+        catalog.pending_items_count += len(skus)
+        for batch in chunks(skus, PARSER_CARDS_BATCH_SIZE):
+            await self.batches.put((catalog, batch))
+
+    def fresh_skus(self, catalog: Catalog, skus: list[int]) -> list[int]:
+        """
+        Продукты каталога, которые нужно собрать. Остальные учитываются как собранные.
+
+        :param catalog: Каталог продуктов
+        :param skus: Идентификаторы продуктов
+        """
+
+        completed = self.journal.completed_skus(catalog.partition_key) if self.journal is not None else set()
+        if not completed and not catalog.parsed_skus:
+            return skus
+        fresh_skus = [sku for sku in skus if sku not in completed and sku not in catalog.parsed_skus]
+        catalog.parsed_items_count += len(skus) - len(fresh_skus)
+        return fresh_skus
+
+    def finish_discovery(self, catalog: Catalog):
+        """
+        Завершение обнаружения продуктов каталога: каталог завершается,
+        как только будут обработаны все переданные продукты.
+
+        :param catalog: Каталог продуктов
+        """
+
+        catalog.discovery_finished = True
+        if catalog.pending_items_count == 0:
+            self.catalog_done(catalog)
+
+    async def produce(self):
+        while (item := await self.batches.get()) is not None:
+            catalog, batch = item
+            new_skus = []
+            for sku in batch:
+                if sku in self.parsed:
+                    self.parsed.move_to_end(sku)
+                    self.reused_count += 1
+                    self.emit(catalog, sku, Product.from_record(
+                        self.parsed[sku], catalog.name, catalog.start_time, catalog.partition_key
+                    ))
+                elif sku in self.in_flight:
+                    self.in_flight[sku].append(catalog)
+                else:
+                    self.in_flight[sku] = []
+                    new_skus.append(sku)
+            if not new_skus:
+                continue
+
+            cards, *batch_orders = await gather(
+                Product.fetch_cards(self.client, self.proxies, self.user_settings, new_skus),
+                *(
+                    Product.fetch_orders_counts(self.client, self.proxies, orders_batch)
+                    for orders_batch in chunks(new_skus, PARSER_ORDERS_BATCH_SIZE)
+                )
+            )
+            orders = {sku: qty for batch_order in batch_orders for sku, qty in batch_order.items()}
+            catalog.batch_cards_count += len(cards)
+            catalog.batch_orders_count += len(orders)
+            for sku in new_skus:
+                await self.queue.put((catalog, sku, cards.get(sku), orders.get(sku)))
+
+    async def work(self):
+        while (item := await self.queue.get()) is not None:
+            catalog, sku, card_json, sold_qty = item
+            product = None
+            try:
+                async with self.client.concurrency:
+                    product = await Product.parse(
+                        client=self.client,
+                        proxies=self.proxies,
+                        sku=sku,
+                        user_settings=self.user_settings,
+                        catalog_name=catalog.name,
+                        start_time=catalog.start_time,
+                        card_json=card_json,
+                        sold_qty=sold_qty,
+                        catalog_key=catalog.partition_key
+                    )
+            except Exception as e:
+                log.error(f'Ошибка парсинга продукта {sku}. {type(e)}: {e}')
+
+            waiting_catalogs = self.in_flight.pop(sku, []) + self.shared.pop(sku, [])
+            if product is not None and product.status:
+                if self.cache_size > 0:
+                    self.parsed[sku] = product.record()
+                    if len(self.parsed) > self.cache_size:
+                        self.parsed.popitem(last=False)
+                self.reused_count += len(waiting_catalogs)
+            self.emit(catalog, sku, product)
+            for waiting_catalog in waiting_catalogs:
+                self.emit(waiting_catalog, sku, product)
+
+    def emit(self, catalog: Catalog, sku: int, product: Product | None):
+        """
+        Вывод продукта в каталоге и учет его обработки.
+
+        :param catalog: Каталог, в котором встретился продукт
+        :param sku: Идентификатор продукта
+        :param product: Собранный продукт, None если при сборе возникла ошибка
+        """
+
+        if product is not None and product.catalog_key != catalog.partition_key:
+            product = product.for_catalog(catalog.name, catalog.start_time, catalog.partition_key)
+        if product is not None and product.status:
+            self.sink.add(product)
+        self.progress.update(1)
+        if catalog.product_parsed(sku, product):
+            self.catalog_done(catalog)
+
+    def catalog_done(self, catalog: Catalog):
+        catalog.finish_parsing()
+        if self.on_catalog_done is not None:
+            self.on_catalog_done(catalog)
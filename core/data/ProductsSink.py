@@ -0,0 +1,41 @@
+from __future__ import annotations
+from typing import Callable
+
+from core.data.Product import Product
+from core.data.RunJournal import RunJournal
+from core.utils import serialize_products, PARSER_SINK_BATCH_SIZE
+
+
+class ProductsSink:
+    """
+    Буфер собранных продуктов с записью в файл пачками по мере сбора.
+
+    :param batch_size: Кол-во продуктов, после которого буфер записывается
+    :param writer: Функция записи списка продуктов
+    :param journal: Журнал запуска, в который заносятся записанные продукты
+    """
+
+    def __init__(
+            self,
+            batch_size: int = PARSER_SINK_BATCH_SIZE,
+            writer: Callable[[list[Product]], int] = serialize_products,
+            journal: RunJournal | None = None
+    ):
+        self.batch_size = batch_size
+        self.writer = writer
+        self.journal = journal
+        self.buffer: list[Product] = []
+        self.written_count = 0
+
+    def add(self, product: Product):
+        self.buffer.append(product)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        products, self.buffer = self.buffer, []
+        self.written_count += self.writer(products)
+        if self.journal is not None:
+            self.journal.products_written(products)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+from urllib.parse import urlparse
+
+
+class QueryVariantCache:
+    """
+    Кэш удачных комбинаций параметров `spp` × `curr` × `appType` по семействам адресов.
+
+    Для семейства (хост + раздел + конечная точка) первой пробуется комбинация,
+    сработавшая в прошлый раз. После `demote_after` неудач подряд она забывается,
+    а каждое `reprobe_every`-е обращение проходит полный перебор заново.
+
+    :param reprobe_every: Периодичность полного перебора комбинаций
+    :param demote_after: Кол-во неудач подряд, после которого комбинация забывается
+    """
+
+    VARIANTS = [
+        {'appType': app_type, 'curr': curr, 'spp': spp}
+        for spp in [0, 30, None]
+        for curr in [None, 'rub']
+        for app_type in [1, None, 30, 2, 3]
+    ]
+
+    def __init__(self, reprobe_every: int = 500, demote_after: int = 2):
+        self.reprobe_every = reprobe_every
+        self.demote_after = demote_after
+        self.preferred: dict[str, int] = {}
+        self.failures: dict[str, int] = {}
+        self.uses: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(address: str) -> str:
+        url = urlparse(address)
+        segments = [segment for segment in url.path.split('/') if segment]
+        if not segments:
+            return url.netloc
+        return f'{url.netloc}/{segments[0]}/{segments[-1]}'
+
+    def variants(self, address: str) -> list[tuple[int, dict]]:
+        """
+        Комбинации параметров в порядке перебора для адреса.
+
+        :param address: URL запроса
+        """
+
+        key = self.key(address)
+        self.uses[key] = self.uses.get(key, 0) + 1
+        variants = list(enumerate(self.VARIANTS))
+        preferred = self.preferred.get(key)
+        if preferred is None or self.uses[key] % self.reprobe_every == 0:
+            return variants
+        return [variants[preferred], *variants[:preferred], *variants[preferred + 1:]]
+
+    def success(self, address: str, index: int):
+        key = self.key(address)
+        if self.preferred.get(key) == index:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.preferred[key] = index
+        self.failures[key] = 0
+
+    def failure(self, address: str, index: int):
+        key = self.key(address)
+        if self.preferred.get(key) != index:
+            return
+        self.failures[key] = self.failures.get(key, 0) + 1
+        if self.failures[key] >= self.demote_after:
+            del self.preferred[key]
+            self.failures[key] = 0
+
+    def __str__(self):
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return f'Кэш параметров запросов: попаданий {self.hits}/{total} ({hit_rate:.2f}%), семейств {len(self.preferred)}'
+
+
+query_variants: QueryVariantCache = QueryVariantCache()
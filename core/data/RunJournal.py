@@ -0,0 +1,209 @@
+from __future__ import annotations
+import json
+import os
+import sqlite3
+from dataclasses import asdict
+from datetime import datetime as dt, timedelta
+from typing import TYPE_CHECKING
+
+from core.data.CatalogFilter import CatalogFilter
+from core.data.CatalogStatus import CatalogStatus
+from core.utils import datetime_product, PARSER_JOURNAL_PATH, PARSER_RESUME_MAX_AGE_HOURS
+from core.logs import logger as log
+
+if TYPE_CHECKING:
+    from core.data.Catalog import Catalog
+    from core.data.Product import Product
+
+
+class RunJournal:
+    """
+    Журнал запуска в SQLite для продолжения после сбоя.
+
+    В журнал попадают подготовленные каталоги (фильтры и идентификаторы продуктов)
+    и записанные в отчет продукты. Продукты заносятся пачками после записи
+    в файл, одной транзакцией на пачку. При продолжении незавершенного запуска
+    подготовленные каталоги восстанавливаются без запросов, записанные продукты
+    не собираются заново, а новые дописываются в отчет продолжаемого запуска.
+
+    Продукты заносятся в журнал только при сборе через :class:`ProductsSink`
+    с журналом: в непотоковом режиме :class:`Parser` собирает лишь подготовку
+    каталогов, поэтому при его продолжении восстанавливаются только каталоги.
+
+    :param path: Путь к файлу SQLite, пустая строка отключает журнал
+    :param max_age_hours: Возраст запуска, после которого он не продолжается
+    """
+
+    def __init__(self, path: str = PARSER_JOURNAL_PATH, max_age_hours: float = PARSER_RESUME_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_hours = max_age_hours
+        self.connection: sqlite3.Connection | None = None
+        self.run_id: int | None = None
+        self.resumed = False
+        self.report_path: str | None = None
+        self.completed: dict[str, set[int]] = {}
+
+    def start(self, report_path: str, resume: bool = False) -> bool:
+        """
+        Начало запуска: продолжение последнего незавершенного или новый запуск.
+        Запуски старше `max_age_hours` не продолжаются.
+        Данные прошлых запусков при начале нового удаляются.
+
+        :param report_path: Путь к отчету нового запуска
+        :param resume: Продолжать незавершенный запуск
+
+        :return: True, если запуск продолжен, путь к его отчету в `report_path`
+        """
+
+        self.report_path = report_path
+        if not self.path:
+            return False
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path)
+            self.connection.executescript(
+                'CREATE TABLE IF NOT EXISTS runs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, started_at TEXT NOT NULL, finished_at TEXT, report_path TEXT NOT NULL);'
+                'CREATE TABLE IF NOT EXISTS prepared_catalogs ('
+                'run_id INTEGER NOT NULL, catalog_key TEXT NOT NULL, state TEXT NOT NULL, '
+                'PRIMARY KEY (run_id, catalog_key));'
+                'CREATE TABLE IF NOT EXISTS completed_skus ('
+                'run_id INTEGER NOT NULL, catalog_key TEXT NOT NULL, sku INTEGER NOT NULL, '
+                'PRIMARY KEY (run_id, catalog_key, sku)) WITHOUT ROWID;'
+            )
+        except sqlite3.Error as e:
+            log.error(f'Ошибка открытия журнала запуска {self.path}, журнал отключен. {type(e)}: {e}')
+            self.connection = None
+            return False
+
+        row = self.connection.execute(
+            'SELECT id, started_at, finished_at, report_path FROM runs ORDER BY id DESC LIMIT 1'
+        ).fetchone()
+        if resume and row is not None and row[2] is None and not self.expired(row[1]):
+            self.run_id = row[0]
+            self.resumed = True
+            self.report_path = row[3]
+            prepared_count = self.connection.execute(
+                'SELECT COUNT(*) FROM prepared_catalogs WHERE run_id = ?', (self.run_id,)
+            ).fetchone()[0]
+            completed_count = self.connection.execute(
+                'SELECT COUNT(*) FROM completed_skus WHERE run_id = ?', (self.run_id,)
+            ).fetchone()[0]
+            log.success(f'Продолжение незавершенного запуска {self.run_id} от {row[1]} в отчет {self.report_path}: '
+                        f'подготовлено каталогов {prepared_count}, записано продуктов {completed_count}')
+        else:
+            if row is not None and row[2] is None:
+                log.info(f'Незавершенный запуск {row[0]} от {row[1]} не продолжается'
+                         f'{"" if resume else " (PARSER_RESUME=0)"}, начат новый запуск')
+            self.run_id = self.connection.execute(
+                'INSERT INTO runs (started_at, report_path) VALUES (?, ?)', (datetime_product(), report_path)
+            ).lastrowid
+            for table in ('prepared_catalogs', 'completed_skus'):
+                self.connection.execute(f'DELETE FROM {table} WHERE run_id != ?', (self.run_id,))
+            self.connection.execute('DELETE FROM runs WHERE id != ?', (self.run_id,))
+        self.connection.commit()
+        return self.resumed
+
+    def expired(self, started_at: str) -> bool:
+        started = dt.strptime(started_at, '%Y-%m-%d %H:%M:%S')
+        return dt.now() - started > timedelta(hours=self.max_age_hours)
+
+    def restore_catalog(self, catalog: Catalog) -> bool:
+        """
+        Восстановление подготовленного каталога из журнала.
+
+        :param catalog: Каталог
+
+        :return: True, если каталог был подготовлен в продолжаемом запуске
+        """
+
+        if self.connection is None or not self.resumed:
+            return False
+        row = self.connection.execute(
+            'SELECT state FROM prepared_catalogs WHERE run_id = ? AND catalog_key = ?',
+            (self.run_id, catalog.partition_key)
+        ).fetchone()
+        if row is None:
+            return False
+        state = json.loads(row[0])
+        catalog.filters_pool = [CatalogFilter(**catalog_filter) for catalog_filter in state['filters']]
+        catalog.price_range = tuple(state['price_range'])
+        catalog.skus_pool = state['skus']
+        catalog.total_items_count = state['total_items_count']
+        catalog.total_pages_count = state['total_pages_count']
+        catalog.total_items_count_percent = state['total_items_count_percent']
+        catalog.status = CatalogStatus(state['status'])
+        log.info(f'Каталог {catalog.name} восстановлен из журнала: {len(catalog.skus_pool)} продуктов')
+        return True
+
+    def catalog_prepared(self, catalog: Catalog):
+        """
+        Запись подготовленного каталога.
+
+        :param catalog: Каталог
+        """
+
+        if self.connection is None:
+            return
+        state = {
+            'filters': [asdict(catalog_filter) for catalog_filter in catalog.filters_pool],
+            'price_range': list(catalog.price_range),
+            'skus': catalog.skus_pool,
+            'total_items_count': catalog.total_items_count,
+            'total_pages_count': catalog.total_pages_count,
+            'total_items_count_percent': catalog.total_items_count_percent,
+            'status': catalog.status.value
+        }
+        self.connection.execute(
+            'INSERT OR REPLACE INTO prepared_catalogs VALUES (?, ?, ?)',
+            (self.run_id, catalog.partition_key, json.dumps(state, ensure_ascii=False))
+        )
+        self.connection.commit()
+
+    def completed_skus(self, catalog_key: str) -> set[int]:
+        """
+        Продукты каталога, записанные в отчет в продолжаемом запуске.
+
+        :param catalog_key: Ключ каталога :attr:`Catalog.partition_key`
+        """
+
+        if self.connection is None or not self.resumed:
+            return set()
+        if catalog_key not in self.completed:
+            self.completed[catalog_key] = {
+                row[0] for row in self.connection.execute(
+                    'SELECT sku FROM completed_skus WHERE run_id = ? AND catalog_key = ?',
+                    (self.run_id, catalog_key)
+                )
+            }
+        return self.completed[catalog_key]
+
+    def products_written(self, products: list[Product]):
+        """
+        Запись пачки продуктов, записанных в отчет.
+
+        :param products: Продукты
+        """
+
+        if self.connection is None:
+            return
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO completed_skus VALUES (?, ?, ?)',
+            ((self.run_id, product.catalog_key, product.sku) for product in products)
+        )
+        self.connection.commit()
+
+    def finish(self):
+        """Отметка о завершении запуска: следующий запуск начнется заново."""
+
+        if self.connection is None:
+            return
+        self.connection.execute('UPDATE runs SET finished_at = ? WHERE id = ?', (datetime_product(), self.run_id))
+        self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
@@ -0,0 +1,45 @@
+from __future__ import annotations
+from typing import Awaitable, Callable
+
+from core.data.KeyValueCache import KeyValueCache
+from core.utils import PARSER_SELLERS_CACHE_SIZE, PARSER_SELLERS_CACHE_TTL_HOURS, PARSER_SELLERS_CACHE_PATH
+
+
+class SellerResolver:
+    """
+    Продавец продукта по идентификатору продавца из карточки.
+
+    sellers.json запрашивается только для продавцов, которых еще нет в кэше,
+    остальные продукты продавца получают наименование и ОГРН из кэша.
+
+    :param cache: Кэш продавцов по идентификатору
+    """
+
+    def __init__(self, cache: KeyValueCache | None = None):
+        self.cache = cache if cache is not None else KeyValueCache(
+            'sellers',
+            PARSER_SELLERS_CACHE_SIZE,
+            PARSER_SELLERS_CACHE_PATH,
+            PARSER_SELLERS_CACHE_TTL_HOURS * 60 * 60
+        )
+
+    async def resolve(
+            self,
+            supplier_id: int | None,
+            fetch: Callable[[], Awaitable[dict | None]]
+    ) -> dict | None:
+        """
+        Продавец по идентификатору.
+
+        :param supplier_id: Идентификатор продавца, None если его нет в карточке
+        :param fetch: Запрос sellers.json, None если получить его не удалось
+
+        :return: JSON продавца, None если получить его не удалось
+        """
+
+        if supplier_id is None:
+            return await fetch()
+        return await self.cache.get_or_fetch(str(supplier_id), fetch)
+
+
+sellers: SellerResolver = SellerResolver()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+from typing import Awaitable, Callable
+
+from core.data.KeyValueCache import KeyValueCache
+from core.utils import PARSER_SUB_CATALOGS_CACHE_SIZE, PARSER_SUB_CATALOGS_CACHE_PATH
+
+
+class SubCatalogResolver:
+    """
+    Подкаталог продукта по предмету и бренду.
+
+    Хлебные крошки зависят от предмета и бренда продукта, а не от самого продукта,
+    поэтому запрос выполняется только для первого продукта каждой пары,
+    остальные получают подкаталог из кэша.
+
+    :param cache: Кэш подкаталогов по паре предмет-бренд
+    """
+
+    def __init__(self, cache: KeyValueCache | None = None):
+        self.cache = cache if cache is not None else KeyValueCache(
+            'sub_catalogs',
+            PARSER_SUB_CATALOGS_CACHE_SIZE,
+            PARSER_SUB_CATALOGS_CACHE_PATH
+        )
+
+    async def resolve(
+            self,
+            subject: int | None,
+            brand_id: int,
+            fetch: Callable[[], Awaitable[str | None]]
+    ) -> str | None:
+        """
+        Подкаталог для пары предмет-бренд.
+
+        :param subject: Идентификатор предмета
+        :param brand_id: Идентификатор бренда
+        :param fetch: Запрос подкаталога, None если получить его не удалось
+
+        :return: Подкаталог, пустая строка если его нет в ответе, None если получить его не удалось
+        """
+
+        if subject is None:
+            return await fetch()
+        return await self.cache.get_or_fetch(f'{subject}:{brand_id}', fetch)
+
+
+sub_catalogs: SubCatalogResolver = SubCatalogResolver()
@@ -0,0 +1,64 @@
+from time import monotonic
+
+from core.proxies.CircuitState import CircuitState
+
+
+class CircuitBreaker:
+    """
+    Предохранитель прокси-сервера.
+
+    CLOSED - прокси в ротации. После `failure_threshold` ошибок подряд (или явного отключения)
+    переходит в OPEN и выводится из ротации. По истечении паузы монитор переводит его
+    в HALF_OPEN и проверяет: при успехе - CLOSED, иначе снова OPEN с удвоенной паузой.
+
+    :param failure_threshold: Кол-во ошибок подряд до размыкания
+    :param cooldown_secs: Начальная пауза перед проверкой разомкнутого прокси
+    :param max_cooldown_secs: Максимальная пауза
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = 5,
+            cooldown_secs: float = 20.0,
+            max_cooldown_secs: float = 600.0
+    ):
+        self.failure_threshold = failure_threshold
+        self.initial_cooldown_secs = cooldown_secs
+        self.cooldown_secs = cooldown_secs
+        self.max_cooldown_secs = max_cooldown_secs
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def record(self, success: bool):
+        if self.state is not CircuitState.CLOSED:
+            return
+        self.failures = 0 if success else self.failures + 1
+        if self.failures >= self.failure_threshold:
+            self.open()
+
+    def open(self):
+        if self.state is CircuitState.OPEN:
+            return
+        self.state = CircuitState.OPEN
+        self.opened_at = monotonic()
+
+    def half_open(self):
+        self.state = CircuitState.HALF_OPEN
+
+    def close(self):
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.cooldown_secs = self.initial_cooldown_secs
+
+    def reopen(self):
+        self.cooldown_secs = min(self.cooldown_secs * 2, self.max_cooldown_secs)
+        self.state = CircuitState.OPEN
+        self.opened_at = monotonic()
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state is CircuitState.CLOSED
+
+    def ready_for_probe(self) -> bool:
+        return self.state is CircuitState.OPEN and monotonic() - self.opened_at >= self.cooldown_secs
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class CircuitState(Enum):
+    CLOSED    = 'closed'
+    OPEN      = 'open'
+    HALF_OPEN = 'half-open'
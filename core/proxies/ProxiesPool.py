@@ -1,22 +1,30 @@
 import random
+from asyncio import gather, Semaphore
+from time import monotonic
 from os import path
 from urllib.parse import urlparse, unquote
-from threading import Timer
-from requests import Session as ClientSession
 
+from core.client.HttpClient import HttpClient
+from core.proxies.ProxyMonitor import ProxyMonitor
 from core.proxies.ProxyServer import ProxyServer
+from core.proxies.ProxyStats import ProxyStats
 from core.proxies.ProxyType import ProxyType
 from core.proxies.ProxyStatus import ProxyStatus
 from core.logs import logger as log
 
 
 class ProxiesPool:
+    EXPLORE_RATE = 0.05
+    CHECK_CONCURRENCY = 50
+    CHECK_TIMEOUT_SECS = 10.0
+
     def __init__(self, file_path: str = path.dirname(path.abspath(__file__)) + '/proxies.txt'):
         self.proxy_pool = []
         self.reachable_proxy_pool = []
         self.enabled = True
         self.load_from_file(file_path)
         self.local_proxy = ProxyServer('localhost')
+        self.monitor: ProxyMonitor | None = None
 
     def load_from_file(self, file_path):
         with open(file_path, 'r') as file:
@@ -32,32 +40,89 @@ class ProxiesPool:
                 except Exception:
                     log.error(f'Ошибка добавления прокси из строки "{line}"')
 
-    async def refresh(self, session: ClientSession, urls_pool: list[str] = None):
+    async def refresh(self, client: HttpClient, urls_pool: list[str] = None):
         if not self.enabled:
             return
         log.info(f'Обновление пула прокси-серверов ({len(self.proxy_pool)})')
+        started = monotonic()
+        semaphore = Semaphore(self.CHECK_CONCURRENCY)
+
+        async def check_connection(proxy: ProxyServer) -> ProxyStatus:
+            async with semaphore:
+                return await proxy.check_connection(client, urls_pool, self.CHECK_TIMEOUT_SECS)
+
+        statuses = await gather(*(check_connection(proxy) for proxy in self.proxy_pool))
         self.reachable_proxy_pool = []
-        for proxy in self.proxy_pool:
-            if await proxy.check_connection(session, urls_pool) is ProxyStatus.REACHABLE:
+        for proxy, status in zip(self.proxy_pool, statuses):
+            if status is ProxyStatus.REACHABLE:
+                proxy.breaker.close()
                 self.reachable_proxy_pool.append(proxy)
-        log.info(f'Пул прокси обновлен. Доступных серверов: {len(self)}/{len(self.proxy_pool)}')
+            else:
+                # Недоступные прокси проверяет монитор и возвращает в пул после успешной проверки
+                proxy.breaker.open()
+        log.info(f'Пул прокси обновлен за {monotonic() - started:.2f} сек. '
+                 f'Доступных серверов: {len(self)}/{len(self.proxy_pool)}')
         if len(self) == 0:
             log.critical(f'Пул прокси пуст. Переключение на резервный')
 
-    def get_random_proxy(self) -> ProxyServer:
-        if self.reachable_proxy_pool and self.enabled :
-            return random.choice(self.reachable_proxy_pool) 
-        else:
-            Timer(20.0, self.get_random_proxy).start()
+    def get_random_proxy(self) -> ProxyServer | None:
+        """Прокси для запроса. None - запрос без прокси, если пул пуст или отключен."""
+
+        while self.reachable_proxy_pool and self.enabled:
+            # Из двух случайных прокси выбирается тот, у которого меньше задержка и доля ошибок.
+            # Небольшая доля запросов распределяется равномерно, чтобы оценки худших прокси обновлялись
+            if len(self.reachable_proxy_pool) == 1 or random.random() < self.EXPLORE_RATE:
+                proxy = random.choice(self.reachable_proxy_pool)
+            else:
+                proxy = min(random.sample(self.reachable_proxy_pool, 2), key=lambda candidate: candidate.stats.cost)
+            if not proxy.breaker.is_closed:
+                # Предохранитель разомкнулся после последних ошибок, прокси выводится из ротации
+                self.reachable_proxy_pool.remove(proxy)
+                if not self.reachable_proxy_pool:
+                    log.critical('Пул прокси пуст. Запросы выполняются без прокси до восстановления серверов')
+                continue
+            proxy.stats.selections += 1
+            return proxy
+        return None
 
     def activate_server(self, proxy: ProxyServer):
-        self.reachable_proxy_pool.append(proxy)
+        if proxy not in self.reachable_proxy_pool:
+            self.reachable_proxy_pool.append(proxy)
 
     def disable(self, proxy : ProxyServer):
         proxy.disable()
-        self.reachable_proxy_pool.remove(proxy)
-        
-        Timer(interval=20.0, function=self.activate_server, kwargs=[self, proxy]).start()
+        if proxy in self.reachable_proxy_pool:
+            self.reachable_proxy_pool.remove(proxy)
+
+    def start_monitor(self, client: HttpClient):
+        """
+        Запуск фоновой проверки разомкнутых прокси.
+
+        :param client: Клиент для создания HTTP-запросов
+        """
+
+        if not self.enabled:
+            return
+        if self.monitor is None:
+            self.monitor = ProxyMonitor(self, client)
+        self.monitor.start()
+
+    async def stop_monitor(self):
+        if self.monitor is not None:
+            await self.monitor.stop()
+
+    def stats(self) -> list[tuple[ProxyServer, ProxyStats]]:
+        """Статистика прокси по убыванию нагрузки."""
+
+        return sorted(
+            ((proxy, proxy.stats) for proxy in self.proxy_pool),
+            key=lambda item: item[1].selections,
+            reverse=True
+        )
+
+    def log_stats(self):
+        for proxy, stats in self.stats():
+            log.info(f'Прокси {proxy}: {stats}')
 
     def __repr__(self):
         return f'ProxiesPool<{[proxy.status for proxy in self.proxy_pool]}>'
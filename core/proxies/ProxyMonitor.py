@@ -0,0 +1,80 @@
+from __future__ import annotations
+from asyncio import CancelledError, Semaphore, Task, create_task, gather, sleep
+from typing import TYPE_CHECKING
+
+from core.client.HttpClient import HttpClient
+from core.proxies.ProxyServer import ProxyServer
+from core.proxies.ProxyStatus import ProxyStatus
+from core.logs import logger as log
+
+if TYPE_CHECKING:
+    from core.proxies.ProxiesPool import ProxiesPool
+
+
+class ProxyMonitor:
+    """
+    Фоновая проверка разомкнутых прокси-серверов.
+    Прокси возвращается в ротацию только после успешной проверки.
+
+    :param proxies_pool: Пул прокси
+    :param client: Клиент для создания HTTP-запросов
+    :param interval_secs: Периодичность обхода разомкнутых прокси
+    """
+
+    def __init__(
+            self,
+            proxies_pool: ProxiesPool,
+            client: HttpClient,
+            interval_secs: float = 5.0
+    ):
+        self.proxies_pool = proxies_pool
+        self.client = client
+        self.interval_secs = interval_secs
+        self.task: Task | None = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = create_task(self.run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except CancelledError:
+            pass
+        self.task = None
+
+    async def run(self):
+        while True:
+            try:
+                await self.probe_open()
+            except CancelledError:
+                raise
+            except Exception as e:
+                log.error(f'Ошибка проверки прокси. {type(e)}: {e}')
+            await sleep(self.interval_secs)
+
+    async def probe_open(self):
+        ready = [proxy for proxy in self.proxies_pool.proxy_pool if proxy.breaker.ready_for_probe()]
+        if not ready:
+            return
+        semaphore = Semaphore(self.proxies_pool.CHECK_CONCURRENCY)
+
+        async def probe(proxy: ProxyServer):
+            async with semaphore:
+                await self.probe(proxy)
+
+        await gather(*(probe(proxy) for proxy in ready))
+
+    async def probe(self, proxy: ProxyServer):
+        proxy.breaker.half_open()
+        status = await proxy.check_connection(self.client, timeout_secs=self.proxies_pool.CHECK_TIMEOUT_SECS)
+        if status is ProxyStatus.REACHABLE:
+            proxy.breaker.close()
+            self.proxies_pool.activate_server(proxy)
+            log.info(f'Сервер {proxy} возвращен в пул')
+        else:
+            proxy.breaker.reopen()
+            log.info(f'Сервер {proxy} недоступен, следующая проверка через {proxy.breaker.cooldown_secs:.0f} сек.')
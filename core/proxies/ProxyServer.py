@@ -1,7 +1,9 @@
 from __future__ import annotations
-from asyncio import gather
-from requests import Session as ClientSession
+from asyncio import as_completed, create_task, wait_for
 
+from core.client.HttpClient import HttpClient
+from core.proxies.CircuitBreaker import CircuitBreaker
+from core.proxies.ProxyStats import ProxyStats
 from core.proxies.ProxyType import ProxyType
 from core.proxies.ProxyStatus import ProxyStatus
 from core.logs import logger as log
@@ -22,6 +24,11 @@ class ProxyServer:
         self.password = password
         self.proxy_type = proxy_type
         self.status = ProxyStatus.UNKNOWN
+        self.stats = ProxyStats()
+        self.breaker = CircuitBreaker()
+
+    def __str__(self):
+        return f'{self.host}:{self.port}' if self.port else self.host
 
     def as_string(self) -> dict | None:
         if self.username:
@@ -38,14 +45,43 @@ class ProxyServer:
         res[self.proxy_type.value]= f"{self.proxy_type.value}://{self.host}"
         return res
 
+    def as_url(self) -> str | None:
+        proxy = self.as_string()
+        if proxy is None:
+            return None
+        return proxy[self.proxy_type.value]
+
     def disable(self):
         self.status = ProxyStatus.UNREACHABLE
+        self.breaker.open()
+
+    def record(self, latency: float, status_code: int | None):
+        """
+        Учет результата запроса через прокси в статистике и предохранителе.
+
+        :param latency: Время запроса в секундах
+        :param status_code: HTTP-статус ответа, None если запрос завершился ошибкой
+        """
+
+        self.stats.record(latency, status_code)
+        self.breaker.record(status_code is not None and status_code != 429 and status_code < 500)
 
     async def check_connection(
             self,
-            session: ClientSession,
-            urls_pool: list[str] = None
+            client: HttpClient,
+            urls_pool: list[str] = None,
+            timeout_secs: float = 10.0
     ) -> ProxyStatus:
+        """
+        Проверка доступности адресов через прокси.
+        Первый адрес проверяется отдельно, остальные - параллельно.
+        Проверка прерывается на первом недоступном адресе.
+
+        :param client: Клиент для создания HTTP-запросов
+        :param urls_pool: Адреса для проверки
+        :param timeout_secs: Таймаут проверки одного адреса в секундах
+        """
+
         if urls_pool is None:
             urls_pool = [
                 'https://www.wildberries.ru/',
@@ -56,29 +92,33 @@ class ProxyServer:
 
         async def check_url(url):
             try:
-                prox = self.as_string()
-                session.proxies.update(prox)
-                with session.get(
-                        url=url,
-                        verify=False
-                        #proxies=self.as_string()
-                ) as response:
-                    if response.status_code < 500 and response.status_code != 429:
-                        return ProxyStatus.REACHABLE
-                    else:
-                        log.error(f'Сервер {self.as_string()}: FAIL {url}')
-                        return ProxyStatus.UNREACHABLE
+                # Проверки прокси не расходуют лимит скорости запросов к хостам
+                response = await wait_for(client.get(url, proxy=self, rate_limited=False), timeout_secs)
+                if response.status_code < 500 and response.status_code != 429:
+                    return ProxyStatus.REACHABLE
+                else:
+                    log.error(f'Сервер {self}: FAIL {url}')
+                    return ProxyStatus.UNREACHABLE
             except Exception as e:
-                log.error(f'Сервер {self.as_string()}: FAIL {url} ({type(e)}: {e})')
+                log.error(f'Сервер {self}: FAIL {url} ({type(e)}: {e})')
                 return ProxyStatus.UNREACHABLE
 
-        tasks = [check_url(url) for url in urls_pool]
-        results = await gather(*tasks)
-
-        if all([result is ProxyStatus.REACHABLE for result in results]):
-            self.status = ProxyStatus.REACHABLE
-            log.info(f'Сервер {self.as_string()}: ОК')
-        else:
+        self.status = ProxyStatus.REACHABLE
+        if urls_pool and await check_url(urls_pool[0]) is not ProxyStatus.REACHABLE:
             self.status = ProxyStatus.UNREACHABLE
+            return self.status
+
+        tasks = [create_task(check_url(url)) for url in urls_pool[1:]]
+        try:
+            for task in as_completed(tasks):
+                if await task is not ProxyStatus.REACHABLE:
+                    self.status = ProxyStatus.UNREACHABLE
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if self.status is ProxyStatus.REACHABLE:
+            log.info(f'Сервер {self}: ОК')
 
         return self.status
@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class ProxyStats:
+    requests:       int = 0
+    successes:      int = 0
+    throttled:      int = 0
+    server_errors:  int = 0
+    failures:       int = 0
+    selections:     int = 0
+    latency_ewma:   float | None = None
+    error_ewma:     float = 0.0
+
+    ALPHA = 0.2  # Вес последнего запроса в скользящих средних
+
+    def record(self, latency: float, status_code: int | None):
+        """
+        Учет результата запроса через прокси.
+
+        :param latency: Время запроса в секундах
+        :param status_code: HTTP-статус ответа, None если запрос завершился ошибкой
+        """
+
+        self.requests += 1
+        if status_code is None:
+            self.failures += 1
+        elif status_code == 429:
+            self.throttled += 1
+        elif status_code >= 500:
+            self.server_errors += 1
+        else:
+            self.successes += 1
+
+        is_error = status_code is None or status_code == 429 or status_code >= 500
+        self.error_ewma = self.ALPHA * is_error + (1 - self.ALPHA) * self.error_ewma
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = self.ALPHA * latency + (1 - self.ALPHA) * self.latency_ewma
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.requests if self.requests else 1.0
+
+    @property
+    def cost(self) -> float:
+        """Ожидаемая стоимость запроса через прокси, чем меньше - тем лучше. Новые прокси - 0."""
+
+        if self.latency_ewma is None:
+            return 0.0
+        return self.latency_ewma * (1 + 10 * self.error_ewma)
+
+    def __str__(self):
+        latency = f'{self.latency_ewma:.2f}с' if self.latency_ewma is not None else '-'
+        return f'выбран {self.selections} раз, запросов {self.requests}, ' \
+               f'успешных {self.success_rate * 100:.1f}%, 429: {self.throttled}, 5xx: {self.server_errors}, ' \
+               f'ошибок {self.failures}, задержка {latency}, оценка {self.cost:.2f}'
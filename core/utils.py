@@ -4,6 +4,7 @@ import os
 import json
 import csv
 import zipfile as zf
+from dataclasses import asdict
 from functools import lru_cache
 import pandas as pd
 
@@ -34,6 +35,50 @@ _PARSER_FILE_PREFIX = os.getenv('PARSER_FILE_PREFIX', 'd_parsed_data_')
 _PARSER_CATALOGS_PATH = os.getenv('PARSER_CATALOGS_PATH', 'csv/catalogs.csv')
 _PARSER_BRANDS_PATH = os.getenv('PARSER_BRANDS_PATH', 'csv/brands.csv')
 _PARSER_SKUS_PATH = os.getenv('PARSER_SKUS_PATH', 'csv/skus_id.csv')
+_PARSER_PARTITIONS_PATH = os.getenv('PARSER_PARTITIONS_PATH', 'csv/partitions.json')
+_PARSER_MENU_INDEX_PATH = os.getenv('PARSER_MENU_INDEX_PATH', 'csv/menu_index.json')
+
+# Кол-во продуктов, запрашиваемых одним запросом карточек и заказов
+PARSER_CARDS_BATCH_SIZE = int(os.getenv('PARSER_CARDS_BATCH_SIZE', '100'))
+PARSER_ORDERS_BATCH_SIZE = int(os.getenv('PARSER_ORDERS_BATCH_SIZE', '100'))
+
+# Максимальное кол-во одновременных запросов фильтров при разбиении каталога по цене
+PARSER_FILTERS_CONCURRENCY = int(os.getenv('PARSER_FILTERS_CONCURRENCY', '10'))
+
+# Кол-во одновременно подготавливаемых каталогов и общий лимит их одновременных запросов
+PARSER_PREPARE_CONCURRENCY = int(os.getenv('PARSER_PREPARE_CONCURRENCY', '8'))
+PARSER_PREPARE_REQUESTS_LIMIT = int(os.getenv('PARSER_PREPARE_REQUESTS_LIMIT', '30'))
+
+# Кол-во одновременно запрашиваемых страниц одного фильтра
+PARSER_PAGES_CONCURRENCY = int(os.getenv('PARSER_PAGES_CONCURRENCY', '5'))
+
+# Кол-во обработчиков продуктов, одновременных пакетных запросов карточек и заказов
+# и кол-во продуктов, записываемых в файл за раз
+PARSER_PRODUCTS_WORKERS = int(os.getenv('PARSER_PRODUCTS_WORKERS', '200'))
+PARSER_BATCH_PRODUCERS = int(os.getenv('PARSER_BATCH_PRODUCERS', '4'))
+PARSER_SINK_BATCH_SIZE = int(os.getenv('PARSER_SINK_BATCH_SIZE', '1000'))
+
+# Потоковый режим: сбор продуктов начинается по мере получения страниц каталогов
+PARSER_STREAMING = os.getenv('PARSER_STREAMING', '0') == '1'
+
+# Кол-во собранных продуктов, хранимых для повторного вывода в других каталогах без запросов
+# (только в потоковом режиме: в обычном каталоги продукта известны заранее)
+PARSER_PRODUCTS_CACHE_SIZE = int(os.getenv('PARSER_PRODUCTS_CACHE_SIZE', '50000'))
+
+# Кэш подкаталогов по предмету и бренду: кол-во в памяти и файл SQLite (пустая строка - только память)
+PARSER_SUB_CATALOGS_CACHE_SIZE = int(os.getenv('PARSER_SUB_CATALOGS_CACHE_SIZE', '50000'))
+PARSER_SUB_CATALOGS_CACHE_PATH = os.getenv('PARSER_SUB_CATALOGS_CACHE_PATH', '')
+
+# Кэш продавцов по идентификатору: кол-во в памяти, срок жизни и файл SQLite (пустая строка - только память)
+PARSER_SELLERS_CACHE_SIZE = int(os.getenv('PARSER_SELLERS_CACHE_SIZE', '50000'))
+PARSER_SELLERS_CACHE_TTL_HOURS = float(os.getenv('PARSER_SELLERS_CACHE_TTL_HOURS', '24'))
+PARSER_SELLERS_CACHE_PATH = os.getenv('PARSER_SELLERS_CACHE_PATH', '')
+
+# Журнал запуска для продолжения после сбоя (пустая строка отключает журнал),
+# продолжение незавершенного запуска (только по PARSER_RESUME=1) и максимальный возраст продолжаемого запуска
+PARSER_JOURNAL_PATH = os.getenv('PARSER_JOURNAL_PATH', 'csv/run_journal.sqlite')
+PARSER_RESUME = os.getenv('PARSER_RESUME', '0') == '1'
+PARSER_RESUME_MAX_AGE_HOURS = float(os.getenv('PARSER_RESUME_MAX_AGE_HOURS', '24'))
 
 # Константы с API URL
 _API_USER_XINFO = 'https://www.wildberries.ru/webapi/user/get-xinfo-v2'
@@ -50,6 +95,10 @@ _API_BRAND_PRODUCTS = 'https://catalog.wb.ru/brands/v2/catalog?brand={brand_id}&
 _MENU_URL = 'https://static-basket-01.wbbasket.ru/vol0/data/main-menu-ru-ru-v3.json'
 
 MAX_PAGES = 100  # WB обычно не даёт больше ~100 страниц
+PAGE_SIZE = 100  # Кол-во товаров на полной странице каталога
+
+# Максимальное кол-во товаров в одном ценовом фильтре (MAX_PAGES страниц по PAGE_SIZE товаров)
+PARSER_FILTER_CAPACITY = int(os.getenv('PARSER_FILTER_CAPACITY', str(MAX_PAGES * PAGE_SIZE)))
 
 def print_stats(
         count: int,
@@ -81,6 +130,20 @@ def api_product_card(
     return _API_PRODUCT_CARD.format(user_settings, sku)
 
 
+def api_product_cards(
+        user_settings: str,
+        skus: list[int]
+) -> str:
+    """
+    Возвращает URL к карточкам нескольких продуктов.
+
+    :param user_settings: Настройки пользователя
+    :param skus: Идентификаторы продуктов
+    """
+
+    return _API_PRODUCT_CARD.format(user_settings, ';'.join(str(sku) for sku in skus))
+
+
 def api_static_card(sku: int) -> str:
     """
     Возвращает URL к статической карточке продукта.
@@ -132,6 +195,16 @@ def api_product_orders(sku: int) -> str:
     return _API_PRODUCT_ORDERS.format(sku)
 
 
+def api_products_orders(skus: list[int]) -> str:
+    """
+    Возвращает URL к информации о кол-ве заказов нескольких продуктов.
+
+    :param skus: Идентификаторы продуктов
+    """
+
+    return _API_PRODUCT_ORDERS.format(','.join(str(sku) for sku in skus))
+
+
 @lru_cache
 def _vol_host(vol: int) -> str:
     """
@@ -377,10 +450,31 @@ def _filepath(filename: str = _filename()) -> str:
     return file_path
 
 
+# Путь к отчету текущего запуска, при продолжении запуска - к отчету продолжаемого
+_report_path = _filepath()
+
+
+def report_path() -> str:
+    """Возвращает путь к CSV-отчету текущего запуска."""
+
+    return _report_path
+
+
+def set_report_path(path: str):
+    """
+    Смена пути к CSV-отчету текущего запуска.
+
+    :param path: Путь к отчету
+    """
+
+    global _report_path
+    _report_path = path
+
+
 def create_csv():
     """Создание CSV-файла."""
 
-    with open(_filepath(), 'w', newline='', encoding='utf-8') as f:
+    with open(report_path(), 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f, delimiter=';')
         writer.writerow(csv_header())
 
@@ -398,7 +492,7 @@ def serialize_products(products_list) -> int:
     products_list = [product for product in products_list if product and product.status]
 
     with open(
-            _filepath(), 'a', newline='', encoding='utf-8'
+            report_path(), 'a', newline='', encoding='utf-8'
     ) as f:
         writer = csv.writer(f, delimiter=';')
         writer.writerows(products_list)
@@ -410,7 +504,7 @@ def serialize_products(products_list) -> int:
 
 def serialize_catalogs(catalogs_list):
     with open(
-            _filepath(), 'a', newline='', encoding='utf-8'
+            report_path(), 'a', newline='', encoding='utf-8'
     ) as f:
         writer = csv.writer(f, delimiter=';')
         writer.writerows(catalogs_list)
@@ -421,7 +515,7 @@ def clear_duplicates():
 
     try:
         log.info(f'Очистка отчета от дубликатов')
-        filepath_csv = _filepath()
+        filepath_csv = report_path()
         report = pd.read_csv(filepath_csv, encoding='utf-8', delimiter=';', on_bad_lines='skip')
         log.info(f'Строк в файле до очистки: {len(report)}')
         report.sort_values(by='date_create', inplace=True)
@@ -438,10 +532,9 @@ def archive_report():
 
     try:
         log.info(f'Упаковка отчета')
-        filename_csv = _filename()
-        filepath_csv = _filepath()
-        filename_zip = _filename('.zip')
-        filepath_zip = _filepath(filename_zip)
+        filepath_csv = report_path()
+        filename_csv = os.path.basename(filepath_csv)
+        filepath_zip = os.path.splitext(filepath_csv)[0] + '.zip'
         compression = zf.ZIP_BZIP2
         with zf.ZipFile(
                 filepath_zip, 'w', compression
@@ -467,8 +560,8 @@ def send_report_sftp():
         cert = _PARSER_SFTP_CERT
         path = _PARSER_SFTP_PATH
 
-        filename_zip = _filename('.zip')
-        filepath_zip_local = _filepath(filename_zip)
+        filepath_zip_local = os.path.splitext(report_path())[0] + '.zip'
+        filename_zip = os.path.basename(filepath_zip_local)
 
         cnopts = pysftp.CnOpts()
         if len(cert):
@@ -568,31 +661,124 @@ def generate_pages_for_filter(
 
 
 
-def _remove_childs(obj):
-    if isinstance(obj, dict):
-        if 'childs' in obj:
-            del obj['childs']
-        for key in obj:
-            _remove_childs(obj[key])
-    elif isinstance(obj, list):
-        for item in obj:
-            _remove_childs(item)
+def chunks(items: list, size: int):
+    """
+    Разбивает список на части не длиннее `size`.
+
+    :param items: Список
+    :param size: Размер части
+    """
+
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _index_categories(categories: list[dict]) -> dict[str, dict]:
+    """
+    Индекс меню за один проход: URL категории -> `shard` и `query`.
+
+    :param categories: Дерево категорий меню
+    """
+
+    index = {}
+    # Обход в прямом порядке: при повторе URL остается последняя категория
+    stack = list(reversed(categories))
+    while stack:
+        item = stack.pop()
+        if 'url' in item:
+            index[item['url']] = {'shard': item.get('shard'), 'query': item.get('query')}
+        stack.extend(reversed(item.get('childs') or []))
+    return index
 
 
-def _flatten_categories(categories):
-    flattened = {}
-    for item in categories:
-        flattened.update({item['url']: item})
-        if 'childs' in item:
-            flattened.update(_flatten_categories(item['childs']))
-    _remove_childs(flattened)
-    return flattened
+def _load_menu_index() -> dict:
+    if not os.path.exists(_PARSER_MENU_INDEX_PATH):
+        return {}
+    try:
+        with open(_PARSER_MENU_INDEX_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        log.error(f'Ошибка чтения индекса меню. {type(e)}: {e}')
+        return {}
 
 
 def get_menu() -> dict:
-    response = get(_MENU_URL)
-    if response.status_code == 200:
-        return _flatten_categories(json.loads(response.text))
+    """
+    Индекс меню WB: URL категории -> `shard` и `query`.
+    Индекс хранится в файле и скачивается заново только если меню изменилось
+    (условный запрос по ETag/Last-Modified). Если меню получить не удалось,
+    используется сохраненный индекс.
+    """
+
+    stored = _load_menu_index()
+    headers = {}
+    if stored.get('etag'):
+        headers['If-None-Match'] = stored['etag']
+    if stored.get('last_modified'):
+        headers['If-Modified-Since'] = stored['last_modified']
+
+    try:
+        response = get(_MENU_URL, headers=headers, timeout=60)
+    except Exception as e:
+        log.error(f'Ошибка получения меню, используется сохраненный индекс. {type(e)}: {e}')
+        return stored.get('index', {})
+
+    if response.status_code == 304 and 'index' in stored:
+        log.info('Меню не изменилось, используется сохраненный индекс')
+        return stored['index']
+    if response.status_code != 200:
+        log.error(f'Ошибка получения меню ({response.status_code}), используется сохраненный индекс')
+        return stored.get('index', {})
+
+    index = _index_categories(json.loads(response.text))
+    try:
+        with open(_PARSER_MENU_INDEX_PATH + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'index': index
+            }, f, ensure_ascii=False)
+        os.replace(_PARSER_MENU_INDEX_PATH + '.tmp', _PARSER_MENU_INDEX_PATH)
+    except Exception as e:
+        log.error(f'Ошибка сохранения индекса меню. {type(e)}: {e}')
+    log.info(f'Индекс меню обновлен: {len(index)} категорий')
+    return index
+
+
+def load_partitions() -> dict[str, list[CatalogFilter]]:
+    """Чтение ценовых фильтров каталогов из прошлого запуска."""
+
+    filepath = _PARSER_PARTITIONS_PATH
+    if not os.path.exists(filepath):
+        return {}
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            partitions = json.load(f)
+        return {
+            key: [CatalogFilter(**catalog_filter) for catalog_filter in catalog_filters]
+            for key, catalog_filters in partitions.items()
+        }
+    except Exception as e:
+        log.error(f'Ошибка чтения фильтров прошлого запуска. {type(e)}: {e}')
+        return {}
+
+
+def save_partitions(partitions: dict[str, list[CatalogFilter]]):
+    """
+    Сохранение ценовых фильтров каталогов для следующего запуска.
+    Фильтры каталогов, не участвовавших в запуске, сохраняются без изменений.
+
+    :param partitions: Фильтры по ключу каталога
+    """
+
+    filepath = _PARSER_PARTITIONS_PATH
+    stored = {
+        key: [asdict(catalog_filter) for catalog_filter in catalog_filters]
+        for key, catalog_filters in {**load_partitions(), **partitions}.items()
+    }
+    with open(filepath + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(stored, f, ensure_ascii=False)
+    os.replace(filepath + '.tmp', filepath)
 
 
 def catalog_groups():
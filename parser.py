@@ -2,19 +2,15 @@ import asyncio as aio
 import sys
 import warnings as w
 w.filterwarnings('ignore')
-from requests import Session as ClientSession
-from requests import adapters
+from core.client.HttpClient import HttpClient
 from core.Parser import Parser
 
 
 async def main():
     ifBySkuList = False
     parser = Parser(ifBySkuList)
-    with ClientSession() as session:
-        adapter = adapters.HTTPAdapter(pool_connections=30, pool_maxsize=100)
-        session.mount('https://', adapter)
-        session.mount('http://', adapter)
-        await parser.parse(session, enable_proxies=True, ifBySkuList=ifBySkuList)
+    async with HttpClient(limit_per_proxy=100, limit_per_host=30) as client:
+        await parser.parse(client, enable_proxies=True, ifBySkuList=ifBySkuList)
 
 
 try:
@@ -0,0 +1,58 @@
+import asyncio
+
+from core.client.AdaptiveLimiter import AdaptiveLimiter
+
+
+def test_limit_grows_after_a_healthy_window():
+    limiter = AdaptiveLimiter(initial=10, max_limit=20)
+
+    for _ in range(10):
+        limiter.record(0.1, 200)
+
+    assert limiter.limit == 11
+
+
+def test_limit_shrinks_on_throttling_once_per_cooldown():
+    limiter = AdaptiveLimiter(initial=20, min_limit=5, decrease_factor=0.5, cooldown_secs=60)
+
+    limiter.record(0.1, 429)
+    limiter.record(0.1, 429)
+
+    assert limiter.limit == 10
+
+
+def test_limit_shrinks_on_error_rate_and_latency():
+    limiter = AdaptiveLimiter(initial=10, decrease_factor=0.5, cooldown_secs=0, error_rate_target=0.05)
+    for _ in range(9):
+        limiter.record(0.1, 200)
+    limiter.record(0.1, 503)
+    assert limiter.limit == 5
+
+    limiter = AdaptiveLimiter(initial=10, decrease_factor=0.5, cooldown_secs=0, latency_target_secs=1.0)
+    for _ in range(10):
+        limiter.record(3.0, 200)
+    assert limiter.limit == 5
+
+
+def test_limit_stays_within_bounds():
+    limiter = AdaptiveLimiter(initial=6, min_limit=5, decrease_factor=0.5, cooldown_secs=0)
+
+    limiter.record(0.1, 429)
+
+    assert limiter.limit == 5
+
+
+def test_acquire_waits_for_free_slot():
+    async def run():
+        limiter = AdaptiveLimiter(initial=1, min_limit=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        limiter.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        return limiter
+
+    limiter = asyncio.run(run())
+
+    assert limiter.in_flight == 1
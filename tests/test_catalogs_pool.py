@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import core.data.CatalogsPool as catalogs_pool_module
+from core.client.AdaptiveLimiter import AdaptiveLimiter
+from core.data.Catalog import Catalog
+from core.data.CatalogFilter import CatalogFilter
+from core.data.CatalogsPool import CatalogsPool
+from core.data.CatalogStatus import CatalogType
+from core.data.Product import Product
+from core.data.ProductsSink import ProductsSink
+
+CATALOG_SIZE = 250
+
+
+def stub_catalogs(monkeypatch, written: list[Product], failing_skus: set[int]):
+    """Каталоги по CATALOG_SIZE продуктов без запросов: продукты из `failing_skus` не собираются."""
+
+    async def fetch_filters(self, client, proxies, address, semaphore, planner):
+        return [CatalogFilter(self.name, CATALOG_SIZE // 100 + 1, CATALOG_SIZE, 0, 100_000_000)]
+
+    async def fetch_filter_skus(self, client, proxies, catalog_filter, seen_skus, semaphore=None, on_skus=None):
+        skus = [int(self.brand_id) * 1000 + index for index in range(CATALOG_SIZE)]
+        if on_skus is not None:
+            await on_skus(skus)
+        return skus
+
+    async def parse(**kwargs):
+        product = Product(kwargs['sku'])
+        product.catalog_name = kwargs['catalog_name']
+        product.catalog_key = kwargs['catalog_key']
+        product.status = kwargs['sku'] not in failing_skus
+        return product
+
+    async def no_batch(client, proxies, *args):
+        return {}
+
+    async def user_settings(client, proxies):
+        return ''
+
+    monkeypatch.setattr(Catalog, 'fetch_filters', fetch_filters)
+    monkeypatch.setattr(Catalog, 'fetch_filter_skus', fetch_filter_skus)
+    monkeypatch.setattr(Product, 'parse', staticmethod(parse))
+    monkeypatch.setattr(Product, 'fetch_cards', staticmethod(no_batch))
+    monkeypatch.setattr(Product, 'fetch_orders_counts', staticmethod(no_batch))
+    monkeypatch.setattr(catalogs_pool_module, 'get_user_settings', user_settings)
+    monkeypatch.setattr(catalogs_pool_module, 'load_partitions', lambda: {})
+    monkeypatch.setattr(
+        catalogs_pool_module,
+        'ProductsSink',
+        lambda journal=None: ProductsSink(writer=lambda products: written.extend(products) or len(products))
+    )
+    monkeypatch.setattr(CatalogsPool, 'save_prepared', lambda self, prepared_catalogs: None)
+
+
+def test_stream_retry_collects_catalog_once(monkeypatch):
+    written = []
+    failing_skus = {1000 + index for index in range(50)}
+    stub_catalogs(monkeypatch, written, failing_skus)
+    pool = CatalogsPool(ifBySkuList=True)
+    pool.catalogs_pool = [
+        Catalog(name='Платья', brand_id=brand_id, xsubject='69', catalog_type=CatalogType.BRAND)
+        for brand_id in ('1', '2')
+    ]
+    client = SimpleNamespace(concurrency=AdaptiveLimiter())
+
+    asyncio.run(pool.stream(client, None))
+
+    failed, complete = pool.catalogs_pool
+    assert pool.retry_catalogs_pool == [failed]
+    assert complete.parsed_items_percentages == 100
+    assert len(written) == 2 * CATALOG_SIZE - len(failing_skus)
+    # Выведенные продукты хранятся только для каталога повторного парсинга
+    assert not complete.parsed_skus and not complete.failed_skus
+    assert len(failed.parsed_skus) == CATALOG_SIZE - len(failing_skus)
+
+    failing_skus.clear()
+    asyncio.run(pool.stream(client, None, is_retry=True))
+
+    assert (failed.total_items_count, len(failed.filters_pool)) == (CATALOG_SIZE, 1)
+    assert failed.parsed_items_count == CATALOG_SIZE
+    assert failed.parsed_items_percentages == 100
+    assert len(written) == 2 * CATALOG_SIZE
+    assert len({(product.catalog_key, product.sku) for product in written}) == 2 * CATALOG_SIZE
+    assert not failed.parsed_skus
@@ -0,0 +1,81 @@
+from core.proxies.CircuitBreaker import CircuitBreaker
+from core.proxies.CircuitState import CircuitState
+from core.proxies.ProxiesPool import ProxiesPool
+from core.proxies.ProxyServer import ProxyServer
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3)
+
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.is_closed
+
+    breaker.record(False)
+    assert breaker.state is CircuitState.OPEN
+
+
+def test_probe_waits_for_cooldown():
+    breaker = CircuitBreaker(cooldown_secs=0)
+    breaker.open()
+    assert breaker.ready_for_probe()
+
+    breaker = CircuitBreaker(cooldown_secs=60)
+    breaker.open()
+    assert not breaker.ready_for_probe()
+
+
+def test_failed_probe_doubles_cooldown_up_to_max():
+    breaker = CircuitBreaker(cooldown_secs=20, max_cooldown_secs=50)
+    breaker.open()
+    breaker.half_open()
+    assert not breaker.is_closed
+
+    breaker.reopen()
+    assert breaker.state is CircuitState.OPEN and breaker.cooldown_secs == 40
+    breaker.reopen()
+    assert breaker.cooldown_secs == 50
+
+    breaker.close()
+    assert breaker.is_closed and breaker.cooldown_secs == 20 and breaker.failures == 0
+
+
+def test_failures_outside_closed_state_are_ignored():
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.open()
+    breaker.half_open()
+
+    breaker.record(False)
+
+    assert breaker.state is CircuitState.HALF_OPEN
+
+
+def test_open_proxy_leaves_rotation(tmp_path):
+    proxies_file = tmp_path / 'proxies.txt'
+    proxies_file.write_text('http://10.0.0.1:8080\nhttp://10.0.0.2:8080\n')
+    proxies = ProxiesPool(str(proxies_file))
+    proxies.reachable_proxy_pool = list(proxies.proxy_pool)
+    failing, working = proxies.proxy_pool
+
+    for _ in range(failing.breaker.failure_threshold):
+        failing.record(1.0, 503)
+
+    assert not failing.breaker.is_closed
+    assert all(proxies.get_random_proxy() is working for _ in range(20))
+
+
+def test_disable_opens_breaker_and_removes_proxy(tmp_path):
+    proxies_file = tmp_path / 'proxies.txt'
+    proxies_file.write_text('http://10.0.0.1:8080\n')
+    proxies = ProxiesPool(str(proxies_file))
+    proxies.reachable_proxy_pool = list(proxies.proxy_pool)
+    proxy: ProxyServer = proxies.proxy_pool[0]
+
+    proxies.disable(proxy)
+
+    assert proxy.breaker.state is CircuitState.OPEN
+    assert len(proxies) == 0
+    assert proxies.get_random_proxy() is None
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from core.client.HttpCache import HttpCache
+from core.client.HttpResponse import HttpResponse
+
+URL = 'https://basket-01.wbbasket.ru/vol1/part100/100/info/ru/card.json'
+
+
+class FakeClient:
+    def __init__(self, *responses: HttpResponse):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def get(self, url, proxy=None, headers=None, record_concurrency=False):
+        self.requests.append(headers)
+        return self.responses.pop(0)
+
+
+def get_json(cache: HttpCache, client: FakeClient):
+    return asyncio.run(cache.get_json(client, URL))
+
+
+def test_fresh_entry_is_served_without_request(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http_cache.sqlite'), ttl_secs=60)
+    client = FakeClient(HttpResponse(URL, 200, json.dumps({'subj_root_name': 'Одежда'}), {'ETag': '"1"'}))
+
+    assert get_json(cache, client) == (200, {'subj_root_name': 'Одежда'})
+    assert get_json(cache, client) == (200, {'subj_root_name': 'Одежда'})
+
+    assert len(client.requests) == 1
+    assert (cache.fresh_hits, cache.downloads) == (1, 1)
+    assert URL in cache.accessed
+    cache.commit()
+    assert not cache.accessed
+    cache.close()
+
+
+def test_stale_entry_is_revalidated(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http_cache.sqlite'), ttl_secs=0)
+    client = FakeClient(
+        HttpResponse(URL, 200, json.dumps({'subj_root_name': 'Одежда'}), {'ETag': '"1"'}),
+        HttpResponse(URL, 304, '')
+    )
+
+    get_json(cache, client)
+    assert get_json(cache, client) == (200, {'subj_root_name': 'Одежда'})
+
+    assert client.requests[1] == {'If-None-Match': '"1"'}
+    assert cache.revalidated_hits == 1
+    cache.close()
+
+
+def test_shorter_ttl_overrides_cache_ttl(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http_cache.sqlite'), ttl_secs=60)
+    client = FakeClient(
+        HttpResponse(URL, 200, json.dumps({'supplierName': 'Продавец'}), {'ETag': '"1"'}),
+        HttpResponse(URL, 304, '')
+    )
+
+    asyncio.run(cache.get_json(client, URL))
+    assert asyncio.run(cache.get_json(client, URL, ttl_secs=0)) == (200, {'supplierName': 'Продавец'})
+
+    assert client.requests[1] == {'If-None-Match': '"1"'}
+    assert (cache.fresh_hits, cache.revalidated_hits) == (0, 1)
+    cache.close()
+
+
+def test_least_recently_accessed_entries_are_evicted(tmp_path):
+    cache = HttpCache(str(tmp_path / 'http_cache.sqlite'), ttl_secs=60, max_bytes=100)
+    body = json.dumps({'value': 'x' * 30})
+    urls = [f'{URL}?n={n}' for n in range(3)]
+
+    async def run():
+        client = FakeClient(*(HttpResponse(url, 200, body) for url in urls))
+        await cache.get_json(client, urls[0])
+        await cache.get_json(client, urls[1])
+        await cache.get_json(client, urls[0])
+        await cache.get_json(client, urls[2])
+
+    asyncio.run(run())
+
+    stored = {row[0] for row in cache.connection.execute('SELECT url FROM responses')}
+    assert stored == {urls[0], urls[2]}
+    cache.close()
@@ -0,0 +1,66 @@
+import asyncio
+
+from core.data.KeyValueCache import KeyValueCache
+
+
+def test_concurrent_requests_fetch_once():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'Платья'
+
+    async def run():
+        cache = KeyValueCache('test')
+        values = await asyncio.gather(*(cache.get_or_fetch('69:1', fetch) for _ in range(5)))
+        return cache, values
+
+    cache, values = asyncio.run(run())
+
+    assert values == ['Платья'] * 5
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (4, 1)
+
+
+def test_waiter_fetches_when_leader_is_cancelled():
+    async def slow_fetch():
+        await asyncio.sleep(10)
+
+    async def fetch():
+        return 'Платья'
+
+    async def run():
+        cache = KeyValueCache('test')
+        leader = asyncio.create_task(cache.get_or_fetch('69:1', slow_fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch('69:1', fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.wait_for(waiter, timeout=1), cache
+
+    value, cache = asyncio.run(run())
+
+    assert value == 'Платья'
+    assert cache.get('69:1') == 'Платья'
+
+
+def test_cancelled_waiter_does_not_cancel_leader():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return 'Платья'
+
+    async def run():
+        cache = KeyValueCache('test')
+        leader = asyncio.create_task(cache.get_or_fetch('69:1', fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch('69:1', fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        value = await leader
+        return value, waiter
+
+    value, waiter = asyncio.run(run())
+
+    assert value == 'Платья'
+    assert waiter.cancelled()
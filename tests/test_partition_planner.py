@@ -0,0 +1,64 @@
+from core.data.CatalogFilter import CatalogFilter
+from core.data.PartitionPlanner import PartitionPlanner
+
+
+def catalog_filter(min_price: int, max_price: int, total_items: int) -> CatalogFilter:
+    return CatalogFilter(
+        name='Платья',
+        total_pages=total_items // 100 + 1,
+        total_items=total_items,
+        min_price=min_price,
+        max_price=max_price
+    )
+
+
+def assert_contiguous(parts: list[tuple[int, int]], low: int, high: int):
+    assert parts[0][0] == low and parts[-1][1] == high
+    for (_, left_high), (right_low, _) in zip(parts, parts[1:]):
+        assert right_low == left_high + 1
+
+
+def test_split_fills_parts_up_to_capacity():
+    planner = PartitionPlanner(capacity=1000, fill_factor=0.8)
+
+    parts = planner.split(0, 100_000_000, 8000, bounds=(10_000, 5_000_000))
+
+    assert len(parts) == 10
+    assert_contiguous(parts, 10_000, 5_000_000)
+
+
+def test_split_ignores_bounds_outside_range():
+    planner = PartitionPlanner(capacity=1000)
+
+    parts = planner.split(1000, 2000, 3000, bounds=(5000, 6000))
+
+    assert_contiguous(parts, 1000, 2000)
+
+
+def test_split_follows_previous_run_distribution():
+    history = [catalog_filter(0, 999, 3000), catalog_filter(1000, 100_000, 1000)]
+    planner = PartitionPlanner(capacity=1000, history=history, fill_factor=1.0)
+
+    parts = planner.split(0, 100_000, 4000)
+
+    assert len(parts) == 4
+    assert_contiguous(parts, 0, 100_000)
+    assert [high for _, high in parts[:3]] == [333, 666, 1000]
+
+
+def test_cover_closes_gaps_between_filters():
+    covered = PartitionPlanner.cover([catalog_filter(100, 200, 10), catalog_filter(500, 900, 20)], 0, 1000)
+
+    assert [(item.min_price, item.max_price, item.total_items) for item in covered] == [
+        (0, 499, 10),
+        (500, 1000, 20)
+    ]
+
+
+def test_bisection_requests_use_baseline_threshold():
+    filters = [catalog_filter(0, 1023, 4000)]
+    planner = PartitionPlanner(capacity=10_000)
+
+    # 4000 товаров равномерно: деление до частей по 1000 - корень, 2 половины и 4 четверти
+    assert planner.bisection_requests(filters, 0, 1023) == 7
+    assert planner.bisection_requests(filters, 0, 1023, threshold=10_000) == 1
@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+from tqdm import tqdm
+
+from core.client.AdaptiveLimiter import AdaptiveLimiter
+from core.data.Catalog import Catalog
+from core.data.CatalogStatus import CatalogType
+from core.data.Product import Product
+from core.data.ProductsScheduler import ProductsScheduler
+from core.data.ProductsSink import ProductsSink
+
+
+def parsed_product(sku: int, catalog: Catalog) -> Product:
+    product = Product(sku)
+    product.title = 'Платье'
+    product.brand_name = 'Бренд'
+    product.sale_price = 1000
+    product.sold_qty = 5
+    product.merchant_name = 'Продавец'
+    product.catalog_name = catalog.name
+    product.catalog_key = catalog.partition_key
+    return product
+
+
+def scheduler_with_sink(written: list[Product]) -> ProductsScheduler:
+    sink = ProductsSink(batch_size=100, writer=lambda products: written.extend(products) or len(products))
+    scheduler = ProductsScheduler(None, None, '', sink)
+    scheduler.progress = tqdm(disable=True)
+    return scheduler
+
+
+def test_record_restores_product_for_other_catalog():
+    first = Catalog(name='Платья', brand_id='1', xsubject='69', catalog_type=CatalogType.BRAND)
+    second = Catalog(name='Платья', brand_id='2', xsubject='69', catalog_type=CatalogType.BRAND)
+    product = parsed_product(1, first)
+
+    restored = Product.from_record(product.record(), second.name, '2026-10-16 10:00:00', second.partition_key)
+
+    assert restored.catalog_key == second.partition_key
+    assert restored.date_parse == '2026-10-16 10:00:00'
+    assert list(restored)[1:10] == list(product)[1:10]
+    assert list(restored)[11:] == list(product)[11:]
+
+
+def test_cached_product_is_emitted_without_parsing():
+    first = Catalog(name='Платья', brand_id='1', xsubject='69', catalog_type=CatalogType.BRAND)
+    second = Catalog(name='Платья', brand_id='2', xsubject='69', catalog_type=CatalogType.BRAND)
+    written = []
+
+    async def run():
+        scheduler = scheduler_with_sink(written)
+        scheduler.parsed[1] = parsed_product(1, first).record()
+        second.start_parsing()
+        await scheduler.submit(second, [1])
+        scheduler.finish_discovery(second)
+        await scheduler.batches.put(None)
+        await scheduler.produce()
+        scheduler.sink.flush()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+
+    assert scheduler.reused_count == 1
+    assert [(product.sku, product.catalog_key) for product in written] == [(1, second.partition_key)]
+    assert second.parsed_items_count == 1 and second.pending_items_count == 0
+
+
+def test_emitted_skus_are_skipped_on_retry():
+    catalog = Catalog(name='Платья', brand_id='1', xsubject='69', catalog_type=CatalogType.BRAND)
+    catalog.parsed_skus = {1, 2}
+
+    async def run():
+        scheduler = scheduler_with_sink([])
+        catalog.start_parsing()
+        await scheduler.submit(catalog, [1, 2, 3])
+        return scheduler
+
+    scheduler = asyncio.run(run())
+
+    assert (catalog.parsed_items_count, catalog.pending_items_count) == (2, 1)
+    assert scheduler.batches.get_nowait() == (catalog, [3])
+
+
+def test_parse_fetches_shared_sku_once_across_distant_catalogs(monkeypatch):
+    parsed_skus = []
+
+    async def parse(**kwargs):
+        parsed_skus.append(kwargs['sku'])
+        product = Product(kwargs['sku'])
+        product.catalog_name = kwargs['catalog_name']
+        product.catalog_key = kwargs['catalog_key']
+        return product
+
+    async def no_batch(client, proxies, *args):
+        return {}
+
+    monkeypatch.setattr(Product, 'parse', staticmethod(parse))
+    monkeypatch.setattr(Product, 'fetch_cards', staticmethod(no_batch))
+    monkeypatch.setattr(Product, 'fetch_orders_counts', staticmethod(no_batch))
+
+    pools = [[1, 2], list(range(100, 400)), [2, 1, 3]]
+    catalogs = [
+        Catalog(name='Платья', brand_id=str(brand_id), xsubject='69', skus_pool=skus_pool, catalog_type=CatalogType.BRAND)
+        for brand_id, skus_pool in enumerate(pools)
+    ]
+    done = []
+    written = []
+
+    async def run():
+        sink = ProductsSink(batch_size=100, writer=lambda products: written.extend(products) or len(products))
+        scheduler = ProductsScheduler(SimpleNamespace(concurrency=AdaptiveLimiter()), None, '', sink, cache_size=1)
+        await scheduler.parse(catalogs, done.append)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+
+    assert sorted(parsed_skus) == sorted({1, 2, 3, *range(100, 400)})
+    assert scheduler.reused_count == 2
+    assert not scheduler.parsed and not scheduler.shared
+    assert sorted(done, key=catalogs.index) == catalogs
+    assert [catalog.parsed_items_percentages for catalog in catalogs] == [100, 100, 100]
+    assert sorted(product.sku for product in written if product.catalog_key == catalogs[2].partition_key) == [1, 2, 3]
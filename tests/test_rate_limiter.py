@@ -0,0 +1,26 @@
+import asyncio
+
+from core.client.RateLimiter import RateLimiter, TokenBucket
+
+
+def test_acquire_after_repeated_throttling():
+    async def run():
+        limiter = RateLimiter({'product-order-qnt.wildberries.ru': 10.0})
+        url = 'https://product-order-qnt.wildberries.ru/by-nm/'
+        bucket = limiter.bucket(url)
+        for _ in range(4):
+            limiter.feedback(url, None, 429, {'Retry-After': '0'})
+        assert bucket.rate < 1
+        await asyncio.wait_for(limiter.acquire(url), timeout=5)
+
+    asyncio.run(run())
+
+
+def test_acquire_with_rate_below_one():
+    async def run():
+        bucket = TokenBucket(0.5, min_rate=0.5)
+        await asyncio.wait_for(bucket.acquire(), timeout=1)
+        bucket.throttled(0)
+        await asyncio.wait_for(bucket.acquire(), timeout=5)
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import asyncio
+
+from core.data.Catalog import Catalog
+from core.data.CatalogStatus import CatalogType
+from core.data.Product import Product
+from core.data.ProductsScheduler import ProductsScheduler
+from core.data.RunJournal import RunJournal
+
+
+def written_product(sku: int, catalog: Catalog) -> Product:
+    product = Product(sku)
+    product.catalog_name = catalog.name
+    product.catalog_key = catalog.partition_key
+    return product
+
+
+def test_resume_catalogs_with_same_name(tmp_path):
+    path = str(tmp_path / 'run_journal.sqlite')
+    first = Catalog(name='Платья', brand_id='1', xsubject='69', catalog_type=CatalogType.BRAND)
+    second = Catalog(name='Платья', brand_id='2', xsubject='69', catalog_type=CatalogType.BRAND)
+
+    journal = RunJournal(path)
+    assert not journal.start('first_report.csv')
+    journal.products_written([written_product(1, first), written_product(2, first)])
+    journal.close()
+
+    journal = RunJournal(path)
+    assert journal.start('second_report.csv', resume=True)
+    assert journal.report_path == 'first_report.csv'
+
+    async def run():
+        scheduler = ProductsScheduler(None, None, '', None, journal=journal)
+        await scheduler.submit(first, [1, 2, 3])
+        await scheduler.submit(second, [1, 2, 3])
+
+    asyncio.run(run())
+    journal.close()
+
+    assert (first.parsed_items_count, first.pending_items_count) == (2, 1)
+    assert (second.parsed_items_count, second.pending_items_count) == (0, 3)
+
+
+def test_finished_run_is_not_resumed(tmp_path):
+    path = str(tmp_path / 'run_journal.sqlite')
+    catalog = Catalog(name='Платья', brand_id='1', xsubject='69', catalog_type=CatalogType.BRAND)
+
+    journal = RunJournal(path)
+    journal.start('first_report.csv')
+    journal.products_written([written_product(1, catalog)])
+    journal.finish()
+    journal.close()
+
+    journal = RunJournal(path)
+    assert not journal.start('second_report.csv', resume=True)
+    assert journal.report_path == 'second_report.csv'
+    assert journal.completed_skus(catalog.partition_key) == set()
+    journal.close()
+
+
+def test_unfinished_run_is_not_resumed_by_default(tmp_path):
+    path = str(tmp_path / 'run_journal.sqlite')
+
+    journal = RunJournal(path)
+    journal.start('first_report.csv')
+    journal.close()
+
+    journal = RunJournal(path)
+    assert not journal.start('second_report.csv')
+    assert journal.report_path == 'second_report.csv'
+    journal.close()